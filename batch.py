@@ -0,0 +1,233 @@
+"""
+Batch jobs: draw patterns into many repositories
+Jobs for different target repositories run in parallel worker processes
+"""
+
+import os
+import json
+import queue
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pattern_calculator import CompactPattern, iter_pattern, validate_text
+from canvas import canvas_from_options
+
+DEFAULT_TARGET_DIR = os.path.join(os.path.expanduser('~'), 'github-contribution-repo')
+
+
+def load_jobs(path):
+    """
+    Read a job file: a JSON object, or a list of objects, with the same keys as the CLI options
+    (repo_url, text, intensity, target_dir, backend, payload, incremental, push, push_batch_commits, pack,
+    object_workers, author_name, author_email, report, start, end, years, levels_file)
+    Instead of text a job may give levels: a level grid as a list of 7 strings, see intensity.levels_to_pattern
+    """
+    with open(path) as f:
+        jobs = json.load(f)
+    if isinstance(jobs, dict):
+        jobs = [jobs]
+
+    for job in jobs:
+        missing = [key for key in ('repo_url',) if not job.get(key)]
+        if not (job.get('text') or job.get('levels') or job.get('levels_file')):
+            missing.append('text (or levels / levels_file)')
+        if missing:
+            raise Exception(f"Job {job!r} is missing {', '.join(missing)}")
+    return jobs
+
+
+def job_label(job):
+    """Short description of what a job draws, for log lines"""
+    if job.get('text'):
+        return repr(job['text'])
+    return job.get('levels_file') or 'level grid'
+
+
+def job_pattern(job, canvas):
+    """Pattern pixels for a job's text or level grid, checked against the canvas"""
+    from intensity import levels_to_pattern, load_levels
+
+    if job.get('text'):
+        valid, message = validate_text(job['text'], canvas.weeks, canvas.last_week_days)
+        if not valid:
+            raise Exception(message)
+        return CompactPattern.from_coordinates(iter_pattern(job['text']))
+
+    pixels = load_levels(job['levels_file']) if job.get('levels_file') else levels_to_pattern(job['levels'])
+    weeks = max((pixel.week for pixel in pixels), default=-1) + 1
+    if weeks > canvas.weeks:
+        raise Exception(f"Level grid too wide! Needs {weeks} weeks, max {canvas.weeks}")
+    for pixel in pixels:
+        # Raises for days of the last, partial week after the canvas end
+        canvas.cell(pixel.week, pixel.day)
+    return CompactPattern.from_coordinates(pixels)
+
+
+def job_target_dir(job):
+    """Local repository directory a job writes to"""
+    return os.path.abspath(os.path.expanduser(job.get('target_dir') or DEFAULT_TARGET_DIR))
+
+
+def plan_job(job):
+    """
+    Dry run of a job: its planner.plan_run result, nothing is cloned or written
+    Incremental jobs are planned against the target directory's local history, if there is one
+    """
+    from planner import plan_run, existing_commit_counts
+
+    canvas = canvas_from_options(job.get('start'), job.get('end'), job.get('years'))
+    coordinates = job_pattern(job, canvas)
+    existing_counts = existing_commit_counts(job_target_dir(job)) if job.get('incremental') else None
+    return plan_run(
+        coordinates,
+        job.get('intensity', 1),
+        canvas,
+        backend=job.get('backend', 'gitpython'),
+        payload=job.get('payload', 'pixel'),
+        existing_counts=existing_counts,
+        pack=job.get('pack', True)
+    )
+
+
+def run_job(job, progress_callback=None):
+    """
+    Initialize the target repo and draw one job's text or level grid into it
+    Returns the summary from create_pattern_commits plus the job's target directory
+    With a 'report' path in the job, a JSON run report is written there and included in the result
+    """
+    # Imported here so argument parsing and --help don't pay for GitPython
+    from git_bot import initialize_repo, create_pattern_commits
+    from push_stage import PUSH_BATCH_COMMITS
+    from run_report import RunReport, NULL_REPORT
+    
+    report = RunReport() if job.get('report') else NULL_REPORT
+
+    canvas = canvas_from_options(job.get('start'), job.get('end'), job.get('years'))
+    with report.stage('pattern'):
+        coordinates = job_pattern(job, canvas)
+
+    target_dir = job_target_dir(job)
+    repo = initialize_repo(job['repo_url'], target_dir, report)
+    result = create_pattern_commits(
+        repo,
+        coordinates,
+        job.get('intensity', 1),
+        progress_callback,
+        job.get('author_name'),
+        job.get('author_email'),
+        backend=job.get('backend', 'gitpython'),
+        incremental=job.get('incremental', False),
+        payload=job.get('payload', 'pixel'),
+        push=job.get('push', 'end'),
+        push_batch_commits=job.get('push_batch_commits') or PUSH_BATCH_COMMITS,
+        pack=job.get('pack', True),
+        object_workers=job.get('object_workers'),
+        report=report,
+        canvas=canvas
+    )
+    result['target_dir'] = target_dir
+    
+    if job.get('report'):
+        report.finish()
+        report.write(os.path.expanduser(job['report']))
+        result['report'] = report.to_dict()
+    return result
+
+
+def _run_repo_jobs(indexed_jobs, events):
+    """
+    Worker process: run the jobs of one target repository in order
+    Progress is posted to the events queue as (job_index, current, total)
+    """
+    results = []
+    for job_index, job in indexed_jobs:
+        last_percentage = -1
+
+        def progress_callback(progress):
+            nonlocal last_percentage
+            # One event per percent keeps the queue cheap
+            if progress['percentage'] != last_percentage:
+                last_percentage = progress['percentage']
+                events.put((job_index, progress['current'], progress['total']))
+
+        try:
+            results.append((job_index, {'ok': True, 'result': run_job(job, progress_callback)}))
+        except Exception as e:
+            results.append((job_index, {'ok': False, 'error': str(e)}))
+        events.put((job_index, None, None))
+    return results
+
+
+def _job_pixels(job):
+    """Pixels in a job's pattern, 0 if it can't be built (the job reports that error when it runs)"""
+    try:
+        return len(job_pattern(job, canvas_from_options(job.get('start'), job.get('end'), job.get('years'))))
+    except Exception:
+        return 0
+
+
+def run_batch(jobs, workers=None, progress_callback=None):
+    """
+    Run jobs across a process pool, one task per target repository
+    Jobs sharing a target directory run sequentially in the same task
+    progress_callback receives aggregated progress over all jobs, in pixels of the jobs' patterns
+    Returns one {'job', 'ok', 'result' | 'error'} dict per job, in job order
+    """
+    groups = {}
+    for job_index, job in enumerate(jobs):
+        groups.setdefault(job_target_dir(job), []).append((job_index, job))
+
+    workers = workers or min(len(groups), os.cpu_count() or 1)
+    if workers > 1:
+        # Repositories already run in parallel, so each job writes its objects on a single core
+        # unless the job file asks otherwise
+        groups = {
+            target_dir: [(job_index, dict({'object_workers': 1}, **job)) for job_index, job in group]
+            for target_dir, group in groups.items()
+        }
+    # Totals are fixed up front, so the aggregate doesn't go backwards as more jobs start
+    job_totals = [_job_pixels(job) for job in jobs] if progress_callback else [0] * len(jobs)
+    total_sum = sum(job_totals)
+    job_progress = [0] * len(jobs)
+    jobs_done = 0
+    results = [None] * len(jobs)
+
+    def handle(event):
+        nonlocal jobs_done
+        job_index, current, total = event
+        if current is None:
+            jobs_done += 1
+            job_progress[job_index] = job_totals[job_index]
+        else:
+            # Pixels skipped as already drawn or resumed past count as done
+            job_progress[job_index] = max(0, min(job_totals[job_index], job_totals[job_index] - total + current))
+
+        if progress_callback:
+            current_sum = sum(job_progress)
+            progress_callback({
+                'job': job_index,
+                'current': current_sum,
+                'total': total_sum,
+                'jobs_done': jobs_done,
+                'jobs_total': len(jobs),
+                'percentage': round((current_sum / total_sum) * 100) if total_sum else 0
+            })
+
+    with multiprocessing.Manager() as manager:
+        events = manager.Queue()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(_run_repo_jobs, group, events) for group in groups.values()}
+
+            while pending:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for job_index, outcome in future.result():
+                        results[job_index] = dict(outcome, job=jobs[job_index])
+
+                # Drain whatever progress arrived meanwhile
+                while True:
+                    try:
+                        handle(events.get_nowait())
+                    except queue.Empty:
+                        break
+
+    return results
@@ -0,0 +1,310 @@
+"""
+Benchmarks for the pattern and commit engines
+
+    python benchmark.py                      # run, compare with benchmark_baseline.json
+    python benchmark.py --update-baseline    # run and store the results as the new baseline
+    python benchmark.py --skip-render --update-baseline   # re-record only the commit benchmarks
+    python benchmark.py --output results.json --backends fast-import object-writer
+
+Render benchmarks report seconds per call (lower is better), commit benchmarks
+commits per second (higher is better). Render times are compared after scaling by
+a reference workload timed in the same run. A result worse than the baseline by more
+than --tolerance fails the run with exit code 1, as does an object-writer run large
+enough for the worker pool that didn't use it (only checked with more than one worker).
+That run is timed with 1 worker and with the pool, and the speedup is reported.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import pattern_calculator
+from pattern_calculator import text_to_pattern, preview_pattern, get_pattern_stats
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_TOLERANCE = 0.5  # Allowed slowdown relative to the baseline before a benchmark fails
+
+RENDER_INPUTS = {
+    'short': 'HELLO',
+    'long': 'THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG 0123456789 ' * 8,
+}
+COMMIT_TEXT = 'HELLO'
+COMMIT_INTENSITIES = (1, 4, 10)
+WORKER_CHECK_TEXT = 'HELLO WORLD ' * 3  # Multi-year pattern with far more objects than PARALLEL_MIN_OBJECTS
+WORKER_CHECK_YEARS = 5
+WORKER_CHECK_REPEATS = 3  # Timed runs with 1 worker and with the pool, the best of each counts
+RENDER_ROUNDS = 20  # Timed rounds per render benchmark, the best one counts
+RENDER_ROUND_SECONDS = 0.05  # Minimum length of one timed round
+
+
+def _calls_per_round(func, min_seconds):
+    """Number of calls to func that take at least min_seconds"""
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        if time.perf_counter() - start >= min_seconds:
+            return calls
+        calls *= 2
+
+
+def _reference_work():
+    """Fixed pure-Python workload timed alongside the render benchmarks to gauge the machine's speed"""
+    return sum(i * i for i in range(1000))
+
+
+def run_render_benchmarks(rounds=RENDER_ROUNDS, round_seconds=RENDER_ROUND_SECONDS):
+    """
+    Seconds per call of the pattern functions, with a cold render cache
+    Every round times each benchmark once and the best round counts; interleaving the rounds
+    spreads each benchmark over the whole run, so a busy stretch on the machine can't skew just one
+    """
+    functions = {
+        'text_to_pattern': text_to_pattern,
+        'preview_pattern': preview_pattern,
+        'get_pattern_stats': get_pattern_stats,
+    }
+    benchmarks = {}
+    for size, text in RENDER_INPUTS.items():
+        for name, func in functions.items():
+            def call(func=func, text=text):
+                # Measure rendering, not cache lookups
+                pattern_calculator.render_cache.clear()
+                func(text)
+            benchmarks[f"{name}[{size}]"] = (call, _calls_per_round(call, round_seconds))
+    benchmarks['reference'] = (_reference_work, _calls_per_round(_reference_work, round_seconds))
+
+    best = dict.fromkeys(benchmarks, float('inf'))
+    for _ in range(rounds):
+        for name, (call, calls) in benchmarks.items():
+            start = time.perf_counter()
+            for _ in range(calls):
+                call()
+            best[name] = min(best[name], (time.perf_counter() - start) / calls)
+    return {name: {'seconds_per_call': seconds} for name, seconds in best.items()}
+
+
+def run_commit_benchmarks(backends):
+    """
+    Commits per second of create_pattern_commits into a temporary repo with a local bare remote
+    The pack stage and the push to the bare remote are timed separately (pack_seconds,
+    push_seconds) so they don't skew commit throughput
+    Object count and pack size after packing are recorded too; planner.py calibrates its
+    estimates from these results
+    """
+    from git_bot import initialize_repo, create_pattern_commits, push_to_remote
+    from pack_stage import pack_repository
+    from push_stage import init_bare_remote
+
+    coordinates = text_to_pattern(COMMIT_TEXT)
+    results = {}
+    for backend in backends:
+        for intensity in COMMIT_INTENSITIES:
+            workdir = tempfile.mkdtemp(prefix='contribution-bench-')
+            try:
+                remote = os.path.join(workdir, 'remote.git')
+                init_bare_remote(remote)
+                repo = initialize_repo(remote, os.path.join(workdir, 'repo'))
+
+                start = time.perf_counter()
+                result = create_pattern_commits(
+                    repo, coordinates, intensity,
+                    author_name='Benchmark', author_email='benchmark@example.com',
+                    backend=backend, push='none', pack=False
+                )
+                elapsed = time.perf_counter() - start
+                pack_result = pack_repository(repo)
+
+                start = time.perf_counter()
+                push_to_remote(repo)
+                push_seconds = time.perf_counter() - start
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+            results[f"{backend}/intensity={intensity}"] = {
+                'pixels': result['pixels'],
+                'commits': result['commits'],
+                'seconds': elapsed,
+                'commits_per_second': result['commits'] / elapsed,
+                'pack_seconds': pack_result['seconds'],
+                'push_seconds': push_seconds,
+                'objects': pack_result['after']['in_pack'],
+                'pack_kib': pack_result['after']['size_pack']
+            }
+    return results
+
+
+def _object_writer_run(canvas, coordinates, object_workers):
+    """One object-writer run of the worker check, returns (seconds, result, chunks sent to the pool)"""
+    from git_bot import initialize_repo, create_pattern_commits
+    from push_stage import init_bare_remote
+    from run_report import RunReport
+
+    report = RunReport()
+    workdir = tempfile.mkdtemp(prefix='contribution-bench-')
+    try:
+        remote = os.path.join(workdir, 'remote.git')
+        init_bare_remote(remote)
+        repo = initialize_repo(remote, os.path.join(workdir, 'repo'))
+
+        start = time.perf_counter()
+        result = create_pattern_commits(
+            repo, coordinates, 4,
+            author_name='Benchmark', author_email='benchmark@example.com',
+            backend='object-writer', push='none', pack=False, report=report, canvas=canvas,
+            object_workers=object_workers
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return elapsed, result, report.counters.get('object_worker_chunks', 0)
+
+
+def check_object_workers(workers=None):
+    """
+    Run the object-writer backend on a multi-year pattern in-process (1 worker) and with the
+    worker pool (workers, default OBJECT_WORKERS), best of WORKER_CHECK_REPEATS runs each, and count
+    the chunks sent to the pool; with more than one worker a run this size has to use the pool
+    Returns {'workers', 'objects', 'chunks', 'seconds_1_worker', 'seconds', 'speedup', 'ok'}
+    """
+    from canvas import ContributionCanvas
+    from object_writer import OBJECT_WORKERS
+
+    workers = workers or OBJECT_WORKERS
+    canvas = ContributionCanvas.for_years(WORKER_CHECK_YEARS)
+    coordinates = text_to_pattern(WORKER_CHECK_TEXT.strip())
+    single_seconds = seconds = float('inf')
+    for _ in range(WORKER_CHECK_REPEATS):
+        single_seconds = min(single_seconds, _object_writer_run(canvas, coordinates, 1)[0])
+        elapsed, result, chunks = _object_writer_run(canvas, coordinates, workers)
+        seconds = min(seconds, elapsed)
+    return {
+        'workers': workers,
+        'objects': result['commits'] + 2 * result['pixels'],
+        'chunks': chunks,
+        'seconds_1_worker': single_seconds,
+        'seconds': seconds,
+        'speedup': single_seconds / seconds,
+        'ok': workers <= 1 or chunks > 0
+    }
+
+
+def environment():
+    git_version = subprocess.run(['git', '--version'], capture_output=True, text=True).stdout.strip()
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'git': git_version,
+        'cpus': os.cpu_count()
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline
+    Render ratios are scaled by the machine's speed relative to the baseline run (see _reference_work)
+    Returns a list of (name, baseline, current, ratio, failed) rows
+    """
+    rows = []
+    baseline_render = baseline.get('render', {})
+    # Render times are compared relative to the reference workload timed in the same run, so a
+    # slower or busier machine doesn't count as a regression
+    machine = 1.0
+    if 'reference' in results['render'] and 'reference' in baseline_render:
+        machine = results['render']['reference']['seconds_per_call'] / baseline_render['reference']['seconds_per_call']
+    for name, current in results['render'].items():
+        reference = baseline_render.get(name)
+        if reference and name != 'reference':
+            ratio = current['seconds_per_call'] / reference['seconds_per_call'] / machine
+            rows.append((name, reference['seconds_per_call'], current['seconds_per_call'], ratio, ratio > 1 + tolerance))
+    for name, current in results['commit'].items():
+        reference = baseline.get('commit', {}).get(name)
+        if reference:
+            ratio = current['commits_per_second'] / reference['commits_per_second']
+            rows.append((name, reference['commits_per_second'], current['commits_per_second'], ratio, ratio < 1 - tolerance))
+    return rows
+
+
+def main(argv=None):
+    from git_bot import COMMIT_BACKENDS
+
+    parser = argparse.ArgumentParser(description='Benchmark the pattern and commit engines')
+    parser.add_argument('--backends', nargs='+', default=list(COMMIT_BACKENDS), help='Commit backends to benchmark (default: all)')
+    parser.add_argument('--skip-commits', action='store_true', help='Only run the render benchmarks')
+    parser.add_argument('--skip-render', action='store_true', help='Only run the commit benchmarks')
+    parser.add_argument('--object-workers', type=int, help='Pool size for the object-writer worker check (default: one per CPU)')
+    parser.add_argument('--output', help='Write the results as JSON to this path')
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='Baseline JSON to compare against')
+    parser.add_argument('--update-baseline', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help=f'Allowed slowdown ratio (default: {DEFAULT_TOLERANCE})')
+    args = parser.parse_args(argv)
+
+    results = {
+        'environment': environment(),
+        'render': {} if args.skip_render else run_render_benchmarks(),
+        'commit': {} if args.skip_commits else run_commit_benchmarks(args.backends)
+    }
+    run_worker_check = not args.skip_commits and 'object-writer' in args.backends
+    results['object_workers'] = check_object_workers(args.object_workers) if run_worker_check else None
+    worker_check = results['object_workers']
+    failures = 0 if not worker_check or worker_check['ok'] else 1
+
+    for name, result in results['render'].items():
+        print(f"{name:32} {result['seconds_per_call'] * 1e6:12.1f} us/call")
+    for name, result in results['commit'].items():
+        print(f"{name:32} {result['commits_per_second']:12.1f} commits/s  ({result['commits']} commits in {result['seconds']:.2f}s, pack {result['pack_seconds']:.2f}s, push {result['push_seconds']:.2f}s)")
+
+    if worker_check:
+        status = 'ok' if worker_check['ok'] else 'POOL UNUSED'
+        print(f"{'object-writer workers':32} {worker_check['chunks']:12d} chunks to {worker_check['workers']} workers for {worker_check['objects']} objects  {status}")
+        print(f"{'object-writer speedup':32} {worker_check['speedup']:12.2f}x  ({worker_check['seconds_1_worker']:.2f}s with 1 worker, {worker_check['seconds']:.2f}s with {worker_check['workers']})")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        # Skipped benchmarks keep their baseline numbers
+        updated = dict(results)
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                updated = json.load(f)
+            updated['environment'] = results['environment']
+            if not args.skip_render:
+                updated['render'] = results['render']
+            if not args.skip_commits:
+                updated['commit'] = results['commit']
+                updated['object_workers'] = results['object_workers']
+        with open(args.baseline, 'w') as f:
+            json.dump(updated, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 1 if failures else 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --update-baseline to create one")
+        return 1 if failures else 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared with {args.baseline} (tolerance {args.tolerance:.0%}):")
+    for name, reference, current, ratio, failed in compare(results, baseline, args.tolerance):
+        failures += failed
+        status = 'REGRESSION' if failed else 'ok'
+        print(f"{name:32} baseline {reference:12.6g}  now {current:12.6g}  x{ratio:5.2f}  {status}")
+
+    if failures:
+        print(f"\n{failures} benchmark(s) regressed beyond the tolerance", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Contribution canvas: the date range a pattern is drawn into
+Week columns start on Sunday like GitHub's contribution graph, so week 0 day 0 is a Sunday
+Cell dates are computed once per canvas, so one canvas per run gives every commit the same calendar
+"""
+
+from datetime import date, datetime, time, timedelta
+
+WEEKS_PER_YEAR = 52  # A one-year canvas spans 52 weeks back plus the current week, GitHub's 53 columns
+COMMIT_TIME = time(12, 0)  # Local time of day for commits, far from midnight so the day never shifts
+
+
+def format_git_date(date):
+    """Format an aware datetime as git's raw '<timestamp> <+hhmm>' date"""
+    offset_minutes = int(date.utcoffset().total_seconds()) // 60
+    sign = '+' if offset_minutes >= 0 else '-'
+    hours, minutes = divmod(abs(offset_minutes), 60)
+    return f"{int(date.timestamp())} {sign}{hours:02d}{minutes:02d}"
+
+
+def week_start(day):
+    """The Sunday on or before day"""
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+class ContributionCanvas:
+    """
+    A grid of week columns from start to end (inclusive)
+    start is moved back to its Sunday so rows line up with GitHub's weekdays
+    Per-cell tables (indexed by week * 7 + day) hold each cell's date, commit datetime
+    and raw git date, so lookups in the commit loop are O(1)
+    """
+
+    def __init__(self, start, end):
+        if end < start:
+            raise Exception(f"Canvas end {end.isoformat()} is before its start {start.isoformat()}")
+        self.start = week_start(start)
+        self.end = end
+        self.weeks = (end - self.start).days // 7 + 1
+        # Days of the last column up to end (7 unless end is before Saturday)
+        self.last_week_days = (end - self.start).days % 7 + 1
+        
+        self.days = [self.start + timedelta(days=cell) for cell in range(self.weeks * 7)]
+        # astimezone per cell picks the UTC offset in effect on that day (DST)
+        self.dates = [datetime.combine(day, COMMIT_TIME).astimezone() for day in self.days]
+        self.git_dates = [format_git_date(target_date) for target_date in self.dates]
+
+    @classmethod
+    def for_years(cls, years=1, end=None):
+        """Canvas of years 52-week years ending on end (default today)"""
+        end = end or date.today()
+        return cls(end - timedelta(weeks=WEEKS_PER_YEAR * years), end)
+
+    @classmethod
+    def last_year(cls):
+        """The graph GitHub shows on a profile"""
+        return cls.for_years(1)
+
+    def cell(self, week, day):
+        """
+        Table index of a grid cell
+        The last column is usually a partial week: its days after end are outside the canvas too
+        """
+        if not 0 <= week < self.weeks:
+            raise Exception(f"Week {week} is outside the canvas ({self.weeks} weeks from {self.start.isoformat()})")
+        if not 0 <= day < 7:
+            raise Exception(f"Day {day} is outside the week (0 = Sunday to 6 = Saturday)")
+        cell = week * 7 + day
+        if self.days[cell] > self.end:
+            raise Exception(f"Week {week}, day {day} ({self.days[cell].isoformat()}) is after the canvas end {self.end.isoformat()}")
+        return cell
+
+    def date_for(self, week, day):
+        """Timezone-aware commit datetime of a grid cell"""
+        return self.dates[self.cell(week, day)]
+
+    def __repr__(self):
+        return f"ContributionCanvas(start={self.start.isoformat()}, end={self.end.isoformat()}, weeks={self.weeks})"
+
+
+def canvas_from_options(start=None, end=None, years=None):
+    """
+    Canvas from CLI / job file options: ISO dates and/or a number of years
+    With a start date the canvas runs to end (default today); otherwise it covers years (default 1) up to end
+    """
+    end = date.fromisoformat(end) if isinstance(end, str) else end
+    start = date.fromisoformat(start) if isinstance(start, str) else start
+    if start:
+        return ContributionCanvas(start, end or date.today())
+    return ContributionCanvas.for_years(years or 1, end)
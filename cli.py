@@ -0,0 +1,169 @@
+"""
+Headless command line entry point
+Draws patterns without importing Tkinter, for cron jobs and CI workers
+
+    python -m cli --repo-url https://github.com/username/repo.git --text HELLO --intensity 3
+    python -m cli --job-file jobs.json --workers 8
+    python -m cli --repo-url https://github.com/username/repo.git --text HELLO --years 5 --dry-run
+"""
+
+import sys
+import json
+import argparse
+from batch import DEFAULT_TARGET_DIR, load_jobs, job_label, run_job, run_batch, plan_job
+from pack_stage import describe_pack_result
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m cli',
+        description='Draw text on a GitHub contribution graph without the GUI'
+    )
+    parser.add_argument('--job-file', help='JSON job file (one job object or a list of them)')
+    parser.add_argument('--repo-url', help='Remote repository URL')
+    parser.add_argument('--text', help='Text to draw')
+    parser.add_argument('--levels-file', help='Draw a level grid instead of text: 7 lines of 0-4 shades, one character per week')
+    parser.add_argument('--intensity', type=int, default=1, help='Commits per full-shade pixel (default: 1); lower shades use the fewest commits that show them')
+    parser.add_argument('--target-dir', default=DEFAULT_TARGET_DIR, help=f'Local repository directory (default: {DEFAULT_TARGET_DIR})')
+    parser.add_argument('--years', type=int, help='Canvas length in 52-week years ending today (default: 1, GitHub\'s profile graph)')
+    parser.add_argument('--start', help='Canvas start date, YYYY-MM-DD (moved back to its Sunday)')
+    parser.add_argument('--end', help='Canvas end date, YYYY-MM-DD (default: today)')
+    parser.add_argument('--backend', default='gitpython', help='Commit backend: gitpython, fast-import or object-writer')
+    parser.add_argument('--payload', choices=['pixel', 'constant'], default='pixel', help="data.json per commit: each pixel's date (default) or one constant payload shared by every commit")
+    parser.add_argument('--incremental', action='store_true', help='Only create commits missing from the existing history')
+    parser.add_argument('--push', choices=['end', 'batched', 'none'], default='end', help="When to push: after all commits (default), in background batches, or not at all")
+    parser.add_argument('--push-batch', type=int, help='Commits per background push with --push batched (default: 1000)')
+    parser.add_argument('--no-pack', dest='pack', action='store_false', help='Skip repacking the repository after the commits')
+    parser.add_argument('--object-workers', type=int, help='Processes the object-writer backend hashes and compresses objects on (default: one per CPU)')
+    parser.add_argument('--author-name', help='Commit author name (default: git config)')
+    parser.add_argument('--author-email', help='Commit author email (default: git config)')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for job files, one per target repository (0 = one per CPU)')
+    parser.add_argument('--dry-run', action='store_true', help='Print the plan (commits, dates, objects, estimated pack size and time) without writing anything')
+    parser.add_argument('--plan-file', help='With --dry-run, write the plans including every planned day and its commit count as JSON to this path')
+    parser.add_argument('--report', help='Write a JSON run report (per-stage timings, commits/sec, bytes written) to this path')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Only print errors')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.job_file:
+        try:
+            jobs = load_jobs(args.job_file)
+        except Exception as e:
+            parser.error(f"invalid job file: {e}")
+    elif args.repo_url and (args.text or args.levels_file):
+        jobs = [{
+            'repo_url': args.repo_url,
+            'text': args.text,
+            'levels_file': args.levels_file,
+            'intensity': args.intensity,
+            'target_dir': args.target_dir,
+            'backend': args.backend,
+            'incremental': args.incremental,
+            'payload': args.payload,
+            'push': args.push,
+            'push_batch_commits': args.push_batch,
+            'pack': args.pack,
+            'object_workers': args.object_workers,
+            'author_name': args.author_name,
+            'author_email': args.author_email,
+            'report': args.report,
+            'start': args.start,
+            'end': args.end,
+            'years': args.years
+        }]
+    else:
+        parser.error('either --job-file or --repo-url with --text or --levels-file is required')
+
+    def log(message):
+        if not args.quiet:
+            print(message, flush=True)
+
+    if args.dry_run:
+        return _main_dry_run(jobs, args.plan_file, log)
+    if args.workers != 1:
+        return _main_batch(jobs, args.workers or None, log)
+
+    failures = 0
+    for job in jobs:
+        log(f"Drawing {job_label(job)} into {job['repo_url']}")
+        last_percentage = -1
+
+        def progress_callback(progress):
+            nonlocal last_percentage
+            # One line per percent is plenty for a log file
+            if progress['percentage'] != last_percentage:
+                last_percentage = progress['percentage']
+                log(f"  [{progress['current']}/{progress['total']}] {progress['percentage']}%")
+
+        try:
+            result = run_job(job, progress_callback)
+        except Exception as e:
+            failures += 1
+            print(f"Error: {job_label(job)} -> {job['repo_url']}: {e}", file=sys.stderr)
+            continue
+
+        log(f"  Done: {result['commits']} commits for {result['pixels']} pixels in {result['target_dir']}")
+        if result['pack']:
+            log(f"  Packed: {describe_pack_result(result['pack'])}")
+        if 'report' in result:
+            log(f"  {result['report']['wall_seconds']:.2f}s, {result['report']['commits_per_second']} commits/s, report written to {job['report']}")
+
+    return 1 if failures else 0
+
+
+def _main_dry_run(jobs, plan_file, log):
+    """Plan every job and print the estimates, nothing is cloned, committed or pushed"""
+    from planner import describe_plan, plan_to_dict
+
+    failures = 0
+    plans = []
+    for job in jobs:
+        try:
+            plan = plan_job(job)
+        except Exception as e:
+            failures += 1
+            print(f"Error: {job_label(job)} -> {job['repo_url']}: {e}", file=sys.stderr)
+            continue
+
+        log(f"Plan for {job_label(job)} into {job['repo_url']}:")
+        for line in describe_plan(plan):
+            log(f"  {line}")
+        plans.append(dict(plan_to_dict(plan), job=job))
+
+    if plan_file:
+        with open(plan_file, 'w') as f:
+            json.dump(plans, f, indent=2)
+        log(f"Plan written to {plan_file}")
+
+    return 1 if failures else 0
+
+
+def _main_batch(jobs, workers, log):
+    """Run jobs across a process pool and report per-job results"""
+    last_percentage = -1
+
+    def progress_callback(progress):
+        nonlocal last_percentage
+        if progress['percentage'] != last_percentage:
+            last_percentage = progress['percentage']
+            log(f"  [{progress['jobs_done']}/{progress['jobs_total']} jobs] {progress['current']}/{progress['total']} pixels, {progress['percentage']}%")
+
+    failures = 0
+    for outcome in run_batch(jobs, workers, progress_callback):
+        job = outcome['job']
+        if outcome['ok']:
+            result = outcome['result']
+            log(f"Done: {job_label(job)} -> {job['repo_url']}: {result['commits']} commits for {result['pixels']} pixels")
+        else:
+            failures += 1
+            print(f"Error: {job_label(job)} -> {job['repo_url']}: {outcome['error']}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Per-date commit-count index for a contribution repository
+One uint16 counter per day, persisted inside the repository's .git directory
+"""
+
+import os
+import sys
+import struct
+import subprocess
+from array import array
+from datetime import date
+
+INDEX_FILENAME = 'contribution-index.bin'
+INDEX_MAGIC = b'CCIX'
+INDEX_VERSION = 1
+HEADER = struct.Struct('<4sHII20s')  # magic, version, origin ordinal, days, head sha
+MAX_COUNT = 0xffff
+
+
+class CommitCountIndex:
+    """
+    Commit counts per calendar day, stored as a dense uint16 array from an origin date
+    Lookups are O(1): the array position is the number of days since the origin
+    """
+
+    def __init__(self, origin=None, counts=None, head=None):
+        self.origin = origin
+        self.counts = counts if counts is not None else array('H')
+        self.head = head
+
+    def get(self, day, default=0):
+        """Number of commits on the given date"""
+        if self.origin is None:
+            return default
+        offset = day.toordinal() - self.origin
+        if 0 <= offset < len(self.counts):
+            return self.counts[offset]
+        return default
+
+    def add(self, day, count=1):
+        """Add commits to the given date, growing the array as needed"""
+        ordinal = day.toordinal()
+        if self.origin is None:
+            self.origin = ordinal
+        if ordinal < self.origin:
+            self.counts[0:0] = array('H', bytes(2 * (self.origin - ordinal)))
+            self.origin = ordinal
+        offset = ordinal - self.origin
+        if offset >= len(self.counts):
+            self.counts.extend([0] * (offset + 1 - len(self.counts)))
+        self.counts[offset] = min(MAX_COUNT, self.counts[offset] + count)
+
+    def save(self, path):
+        """Write the index atomically"""
+        counts = array('H', self.counts)
+        if sys.byteorder != 'little':
+            counts.byteswap()
+        head = bytes.fromhex(self.head) if self.head else bytes(20)
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.origin or 0, len(counts), head))
+            f.write(counts.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save(), or None if missing or unreadable"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        if len(data) < HEADER.size:
+            return None
+        magic, version, origin, days, head = HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or len(data) != HEADER.size + 2 * days:
+            return None
+
+        counts = array('H')
+        counts.frombytes(data[HEADER.size:])
+        if sys.byteorder != 'little':
+            counts.byteswap()
+        return cls(origin or None, counts, head.hex() if any(head) else None)
+
+
+def index_path(repo):
+    """Location of the index file for a repository"""
+    return os.path.join(repo.git_dir, INDEX_FILENAME)
+
+
+def scan_commit_dates(repo, index, revisions='HEAD'):
+    """Add the author date of every commit in revisions to index in one streaming `git log` pass"""
+    process = subprocess.Popen(
+        ['git', 'log', '--format=%ad', '--date=short', revisions],
+        cwd=repo.working_dir,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    for line in process.stdout:
+        index.add(date.fromisoformat(line.strip()))
+    process.stdout.close()
+    if process.wait() != 0:
+        raise Exception("Failed to read existing commit history")
+
+
+def load_commit_index(repo, save=True):
+    """
+    Load the index for a repository and bring it up to date with HEAD
+    Only commits added since the index was saved are scanned; rewritten history triggers a full rebuild
+    save=False leaves the saved index untouched, e.g. for dry runs
+    """
+    if not repo.head.is_valid():
+        return CommitCountIndex()
+
+    head = repo.head.commit.hexsha
+    index = CommitCountIndex.load(index_path(repo))
+
+    if index is not None and index.head == head:
+        return index
+
+    try:
+        can_catch_up = index is not None and index.head and repo.is_ancestor(index.head, head)
+    except Exception:
+        # The indexed head no longer exists
+        can_catch_up = False
+
+    if can_catch_up:
+        scan_commit_dates(repo, index, f"{index.head}..{head}")
+    else:
+        index = CommitCountIndex()
+        scan_commit_dates(repo, index)
+
+    index.head = head
+    if save:
+        index.save(index_path(repo))
+    return index
@@ -395,3 +395,19 @@ UNKNOWN_CHAR = [
     [1, 0, 0, 0, 1],
     [1, 1, 1, 1, 1]
 ]
+
+
+def compile_glyph(rows):
+    """
+    Pack a glyph into one bitmask per column
+    Bit n of a column mask is set when row (day) n is lit
+    """
+    return tuple(
+        sum(rows[row][col] << row for row in range(len(rows)))
+        for col in range(len(rows[0]))
+    )
+
+
+# Packed glyphs, compiled once at import
+GLYPH_COLUMNS = {char: compile_glyph(rows) for char, rows in FONTS.items()}
+UNKNOWN_GLYPH_COLUMNS = compile_glyph(UNKNOWN_CHAR)
@@ -4,21 +4,53 @@ Git operations for creating backdated commits
 
 import os
 import json
-from datetime import datetime, timedelta
-from git import Repo, Actor
+import subprocess
+from array import array
+from datetime import date
+from git import Repo, Actor, Commit
+from canvas import ContributionCanvas
+from intensity import effective_peak, level_target
+from pattern_calculator import CompactPattern
+from commit_index import load_commit_index, index_path
+from run_journal import pattern_fingerprint, load_journal, save_journal, clear_journal
+from run_report import NULL_REPORT
+from pack_stage import pack_repository
+from push_stage import PushStage, push_with_retry, PUSH_BATCH_COMMITS, PUSH_RETRIES, PUSH_BACKOFF
+from object_writer import PackWriter, ObjectCache, OBJECT_WORKERS, PARALLEL_MIN_OBJECTS, pool_stats, OBJ_TREE, OBJ_COMMIT, hash_object, parse_tree, serialize_tree, serialize_commit
+
+CHECKPOINT_PIXELS = 100  # Pixels committed between run journal checkpoints
+PAYLOAD_MODES = ('pixel', 'constant')
+CONSTANT_PAYLOAD = b'{}'  # data.json in constant payload mode, the same content initialize_repo starts with
+
+
+_default_canvas = None
+
+
+def default_canvas():
+    """The one-year canvas ending today, built once per day"""
+    global _default_canvas
+    if _default_canvas is None or _default_canvas.end != date.today():
+        _default_canvas = ContributionCanvas.last_year()
+    return _default_canvas
 
 
 def calculate_date(weeks, days):
-    """Calculate date based on weeks and days offset from one year ago"""
-    one_year_ago = datetime.now() - timedelta(days=365)
-    target_date = one_year_ago + timedelta(weeks=weeks, days=days+1)
-    return target_date
+    """
+    Calculate the commit date of a cell on the default one-year, Sunday-aligned canvas
+    Runs should create one canvas and look dates up in it instead, see create_pattern_commits
+    """
+    return default_canvas().date_for(weeks, days)
 
 
-def initialize_repo(repo_url, target_dir):
+def initialize_repo(repo_url, target_dir, report=NULL_REPORT):
     """
     Initialize or clone a repository
     """
+    with report.stage('initialize_repo'):
+        return _initialize_repo(repo_url, target_dir)
+
+
+def _initialize_repo(repo_url, target_dir):
     # Create directory if it doesn't exist
     if not os.path.exists(target_dir):
         os.makedirs(target_dir, exist_ok=True)
@@ -46,65 +78,241 @@ def initialize_repo(repo_url, target_dir):
     return repo
 
 
-def mark_commit(repo, week, day, intensity=1, message=None, author_name=None, author_email=None):
+def mark_commit(repo, week, day, intensity=1, message=None, author_name=None, author_email=None, report=NULL_REPORT, target_date=None, payload=None):
     """
     Create a commit (or multiple for intensity) at a specific coordinate
+    target_date defaults to the cell's date on the one-year canvas
+    payload (bytes) replaces the default data.json content
+    The tree is written once and shared by all intensity commits, only commit objects are written per commit
+    Returns the last commit created
     """
-    target_date = calculate_date(week, day)
+    target_date = target_date or calculate_date(week, day)
     data_file = os.path.join(repo.working_dir, 'data.json')
     
     # Write data
-    data = {
+    with report.stage('write_data'):
+        with open(data_file, 'wb') as f:
+            f.write(payload if payload is not None else _pixel_payload(week, day, target_date))
+            report.count('bytes_written', f.tell())
+    
+    # Stage the file
+    with report.stage('index_add'):
+        repo.index.add(['data.json'])
+    
+    with report.stage('write_tree'):
+        tree = repo.index.write_tree()
+    
+    # Set author if provided, otherwise create_from_tree uses the git config default
+    author = Actor(author_name, author_email) if author_name and author_email else None
+    commit_message = message or f"{target_date.isoformat()} ({week},{day})"
+    return _commit_tree(repo, tree, intensity, commit_message, author, target_date, report)
+
+
+def _commit_tree(repo, tree, count, message, author, target_date, report=NULL_REPORT):
+    """Create count commits of tree on top of HEAD, chained in memory; HEAD moves once, to the last one"""
+    parent = repo.head.commit if repo.head.is_valid() else None
+    for i in range(count):
+        with report.stage('write_commit'):
+            parent = Commit.create_from_tree(
+                repo, tree, message,
+                parent_commits=[parent] if parent else [],
+                head=i == count - 1,
+                author=author, committer=author,
+                author_date=target_date, commit_date=target_date
+            )
+    return parent
+
+
+
+def _resolve_identity(repo, author_name=None, author_email=None):
+    """Return (author, committer) actors, falling back to git config like index.commit does"""
+    if author_name and author_email:
+        author = Actor(author_name, author_email)
+        return author, author
+    
+    config_reader = repo.config_reader()
+    return Actor.author(config_reader), Actor.committer(config_reader)
+
+
+def _pixel_payload(week, day, target_date):
+    """data.json content for a pixel in 'pixel' payload mode"""
+    return json.dumps({
         'date': target_date.isoformat(),
         'week': week,
         'day': day
-    }
-    
-    with open(data_file, 'w') as f:
-        json.dump(data, f, indent=2)
+    }, indent=2).encode('utf-8')
+
+
+def _current_branch(repo):
+    """Name of the branch HEAD points at (the branch may not have commits yet)"""
+    if repo.head.is_detached:
+        return 'main'
+    return repo.head.reference.name
+
+
+def _commit_with_gitpython(repo, plan, on_pixel, author_name, author_email, report, cache):
+    """
+    Commit backend: one mark_commit per pixel through the working tree and index
+    A pixel whose payload is already at the branch tip reuses the tip's tree without touching the index
+    """
+    author = Actor(author_name, author_email) if author_name and author_email else None
+    for i, (coord, commits, target_date, git_date, payload) in enumerate(plan):
+        message = f"Pattern: {coord['char']} ({coord['week']},{coord['day']})"
+        if cache.tip_tree is not None and payload == cache.tip_payload:
+            cache.hits += 1
+            _commit_tree(repo, cache.tip_tree, commits, message, author, target_date, report)
+        else:
+            cache.misses += 1
+            commit = mark_commit(repo, coord['week'], coord['day'], commits, message, author_name, author_email, report, target_date, payload)
+            cache.tip_payload, cache.tip_tree = payload, commit.tree
+        on_pixel(i, coord)
+
+
+def _commit_with_fast_import(repo, plan, on_pixel, author_name, author_email, report, cache):
+    """
+    Commit backend: stream a batch's commits into one `git fast-import` process
+    Produces the same commits as the gitpython backend without touching the index per commit
+    """
+    author, committer = _resolve_identity(repo, author_name, author_email)
+    branch = _current_branch(repo)
+    ref = f"refs/heads/{branch}"
+    parent = repo.head.commit.hexsha if repo.head.is_valid() else None
     
-    # Stage the file
-    repo.index.add(['data.json'])
+    process = subprocess.Popen(
+        ['git', 'fast-import', '--quiet', '--date-format=raw'],
+        cwd=repo.working_dir,
+        stdin=subprocess.PIPE
+    )
+    stream = process.stdin
     
-    # Create commits (intensity times)
-    for i in range(intensity):
-        commit_message = message or f"{target_date.isoformat()} ({week},{day})"
+    try:
+        for i, (coord, commits, target_date, git_date, payload) in enumerate(plan):
+            week, day = coord['week'], coord['day']
+            message = f"Pattern: {coord['char']} ({week},{day})".encode('utf-8')
+            chunks = []
+            # Every commit of a pixel shares its header; data.json only changes on the first
+            header = (
+                f"commit {ref}\n"
+                f"author {author.name} <{author.email}> {git_date}\n"
+                f"committer {committer.name} <{committer.email}> {git_date}\n"
+            ).encode('utf-8') + b"data %d\n%s\n" % (len(message), message)
+            
+            for n in range(commits):
+                chunks.append(header)
+                
+                if parent:
+                    # Continue from the existing branch tip on the first commit only
+                    chunks.append(f"from {parent}\n".encode('utf-8'))
+                    parent = None
+                
+                # Only the first commit per pixel changes data.json, like mark_commit,
+                # and not at all when the branch tip already has this content
+                if n == 0:
+                    if payload == cache.tip_payload:
+                        cache.hits += 1
+                    else:
+                        cache.misses += 1
+                        cache.tip_payload = payload
+                        chunks.append(b"M 100644 inline data.json\n")
+                        chunks.append(b"data %d\n%s\n" % (len(payload), payload))
+                chunks.append(b"\n")
+            
+            with report.stage('fast_import_stream'):
+                data = b''.join(chunks)
+                stream.write(data)
+            report.count('bytes_written', len(data))
+            
+            on_pixel(i, coord)
+    finally:
+        # Closing stdin lets fast-import finish the commits received so far
+        with report.stage('fast_import_finish'):
+            stream.close()
+            returncode = process.wait()
+        if returncode != 0:
+            raise Exception(f"git fast-import failed with exit code {returncode}")
         
-        # Set author if provided
-        if author_name and author_email:
-            author = Actor(author_name, author_email)
-            repo.index.commit(commit_message, author=author, committer=author, author_date=target_date, commit_date=target_date)
-        else:
-            # Use git config default
-            repo.index.commit(commit_message, author_date=target_date, commit_date=target_date)
+        # Bring index and data.json in line with the new branch tip
+        if repo.head.is_valid():
+            with report.stage('sync_working_tree'):
+                repo.head.reset(index=True, working_tree=True)
+
 
+def _base_tree(repo):
+    """
+    Entries of HEAD's tree other than data.json, and the id of the tree they form
+    Every commit of a run starts from these, so files other than data.json are kept
+    """
+    base_entries = []
+    if repo.head.is_valid():
+        tree_data = repo.odb.stream(repo.head.commit.tree.binsha).read()
+        base_entries = [entry for entry in parse_tree(tree_data) if entry[1] != b'data.json']
+    return base_entries, hash_object(OBJ_TREE, serialize_tree(base_entries))
 
 
-def create_pattern_commits(repo, coordinates, intensity=1, progress_callback=None, author_name=None, author_email=None):
+def _commit_with_object_writer(repo, plan, on_pixel, author_name, author_email, report, cache):
     """
-    Create commits from pattern coordinates
+    Commit backend: build blobs, trees and commits in memory and write them as one packfile
+    create_pattern_commits calls it once per checkpoint batch, so a run writes one pack per batch
+    The branch ref is updated once per batch, the index and working tree are never touched per commit
+    Blobs and trees come from cache, which create_pattern_commits prepares for the whole run up
+    front; new ones and the commits' compression are spread over cache.workers processes, only
+    the commit chain (each commit hashes its parent) stays serial
     """
-    total = len(coordinates)
+    author, committer = _resolve_identity(repo, author_name, author_email)
+    branch = _current_branch(repo)
+    ref = f"refs/heads/{branch}"
+    old_head = repo.head.commit.hexsha if repo.head.is_valid() else None
+    
+    base_entries, base_key = _base_tree(repo)
+    
+    writer = PackWriter(repo.git_dir, workers=cache.workers)
+    parent = old_head
+    plan = list(plan)
     
-    for i, coord in enumerate(coordinates):
-        week = coord['week']
-        day = coord['day']
-        char = coord['char']
+    try:
+        # Nothing left to build when the run was prepared up front
+        with report.stage('prepare_objects'):
+            cache.prepare([entry[4] for entry in plan], base_key, base_entries, b'data.json', writer.compression)
         
-        message = f"Pattern: {char} ({week},{day})"
-        mark_commit(repo, week, day, intensity, message, author_name, author_email)
+        for i, (coord, commits, target_date, git_date, payload) in enumerate(plan):
+            week, day = coord['week'], coord['day']
+            message = f"Pattern: {coord['char']} ({week},{day})"
+            author_line = f"{author.name} <{author.email}> {git_date}"
+            committer_line = f"{committer.name} <{committer.email}> {git_date}"
+            
+            with report.stage('build_objects'):
+                tree = cache.take(writer, payload, base_key)
+                
+                # One tree for all of the pixel's commits, only commit objects are hashed in the loop
+                # and their compression is left to writer.write()
+                for n in range(commits):
+                    parent = writer.add(OBJ_COMMIT, serialize_commit(tree, parent, author_line, committer_line, message), defer=True)
+            
+            on_pixel(i, coord)
+    finally:
+        # Keep whatever was built before a stop, like the other backends
+        with report.stage('pack_write'):
+            pack_path = writer.write()
+        report.count('bytes_written', writer.bytes_written)
         
-        if progress_callback:
-            progress_callback({
-                'current': i + 1,
-                'total': total,
-                'week': week,
-                'day': day,
-                'char': char,
-                'percentage': round(((i + 1) / total) * 100)
-            })
-    
-    # Push to remote
+        if pack_path:
+            with report.stage('update_ref'):
+                repo.git.update_ref('-m', 'pattern: object writer', ref, parent, old_head or '0' * 40)
+            with report.stage('sync_working_tree'):
+                repo.head.reset(index=True, working_tree=True)
+
+
+COMMIT_BACKENDS = {
+    'gitpython': _commit_with_gitpython,
+    'fast-import': _commit_with_fast_import,
+    'object-writer': _commit_with_object_writer,
+}
+
+PUSH_MODES = ('end', 'batched', 'none')
+
+
+def push_to_remote(repo, retries=PUSH_RETRIES, backoff=PUSH_BACKOFF, report=NULL_REPORT):
+    """Push the current branch to origin, retrying with backoff"""
     try:
         origin = repo.remote('origin')
         
@@ -119,7 +327,206 @@ def create_pattern_commits(repo, coordinates, intensity=1, progress_callback=Non
             current_branch = repo.active_branch.name
         
         # Push with force to handle first push
-        origin.push(refspec=f'{current_branch}:{current_branch}', force=True)
+        with report.stage('push'):
+            push_with_retry(origin, f'{current_branch}:{current_branch}', True, retries, backoff)
     except Exception as e:
         raise Exception(f"Failed to push to remote: {str(e)}")
 
+
+def build_plan(coordinates, peak, canvas, existing_counts=None, start=0):
+    """
+    Plan commits for coordinates[start:] as three parallel arrays:
+    positions (index in coordinates), canvas cells and the number of commits for that pixel
+    Each pixel's target is the commit count for its level against peak (full level = peak)
+    With existing_counts, pixels are topped up to their target instead of getting the target again
+    Pixels outside the canvas raise before anything is committed
+    """
+    positions = array('I')
+    cells = array('I')
+    plan_commits = array('H')
+    for position in range(start, len(coordinates)):
+        coord = coordinates[position]
+        cell = canvas.cell(coord['week'], coord['day'])
+        commits = level_target(coord, peak)
+        if existing_counts is not None:
+            commits -= existing_counts.get(canvas.days[cell], 0)
+        if commits > 0:
+            positions.append(position)
+            cells.append(cell)
+            plan_commits.append(commits)
+    return positions, cells, plan_commits
+
+
+def create_pattern_commits(repo, coordinates, intensity=1, progress_callback=None, author_name=None, author_email=None, backend='gitpython', incremental=False, resume=True, checkpoint_every=CHECKPOINT_PIXELS, push='end', push_batch_commits=PUSH_BATCH_COMMITS, report=NULL_REPORT, canvas=None, payload='pixel', pack=True, object_workers=None):
+    """
+    Create commits from pattern coordinates
+    intensity is the commit count of a full-level pixel; pixels with a lower 'level' get the
+    fewest commits that show that shade (see intensity.py)
+    backend selects how commits are written, see COMMIT_BACKENDS
+    incremental only creates the commits missing from the existing history; a busier existing
+    day on the canvas raises the peak the levels are measured against
+    resume continues an interrupted run of the same pattern from its journal
+    Progress is checkpointed every checkpoint_every pixels
+    push is one of PUSH_MODES: 'end' pushes once all commits exist, 'batched' pushes every
+    push_batch_commits commits in the background while generation continues, 'none' skips pushing
+    report (a run_report.RunReport) collects per-stage timings and counters
+    canvas (a canvas.ContributionCanvas) sets the dates the grid maps to, default the last year
+    payload is one of PAYLOAD_MODES: 'pixel' writes each pixel's date and position to data.json,
+    'constant' gives every commit the same data.json, so the whole run shares one blob and one tree
+    pack runs pack_stage.pack_repository after the commits, so loose objects and batch packs don't
+    pile up across runs; its before/after sizes are returned as 'pack'
+    object_workers is the number of processes the object-writer backend hashes and compresses
+    objects on, default OBJECT_WORKERS (one per CPU); runs creating fewer than PARALLEL_MIN_OBJECTS
+    objects stay in-process. The run report's object_worker_chunks counts the work sent to the pool
+    coordinates may be a list of dicts, a CompactPattern or any iterable of pixels (e.g. iter_pattern)
+    Returns a summary with the number of pixels and commits created and the peak used
+    """
+    if backend not in COMMIT_BACKENDS:
+        raise Exception(f"Unknown commit backend '{backend}' (choose from {', '.join(COMMIT_BACKENDS)})")
+    if push not in PUSH_MODES:
+        raise Exception(f"Unknown push mode '{push}' (choose from {', '.join(PUSH_MODES)})")
+    if payload not in PAYLOAD_MODES:
+        raise Exception(f"Unknown payload mode '{payload}' (choose from {', '.join(PAYLOAD_MODES)})")
+    
+    # One canvas per run: every commit is dated from the same precomputed calendar
+    canvas = canvas or ContributionCanvas.last_year()
+    
+    if not hasattr(coordinates, '__getitem__'):
+        # Resume and batching need random access, so one-shot streams are compacted once
+        coordinates = CompactPattern.from_coordinates(coordinates)
+    
+    with report.stage('load_commit_index'):
+        commit_index = load_commit_index(repo)
+    fingerprint = pattern_fingerprint(coordinates, intensity, canvas.start)
+    head = repo.head.commit.hexsha if repo.head.is_valid() else None
+    
+    # Pick up where an interrupted run of the same pattern stopped
+    start = 0
+    journal = load_journal(repo) if resume else None
+    if journal and journal['fingerprint'] == fingerprint:
+        start = journal['completed']
+        if journal['head'] != head:
+            # Killed between checkpoints: top up the rest from the actual history
+            incremental = True
+    
+    with report.stage('plan'):
+        existing_counts = commit_index if incremental else None
+        peak = effective_peak(intensity, existing_counts, canvas.days)
+        positions, cells, plan_commits = build_plan(coordinates, peak, canvas, existing_counts, start)
+    total = len(positions)
+    backend_commit = COMMIT_BACKENDS[backend]
+    
+    progress = {'done': 0, 'indexed': 0, 'stopped': False}
+    
+    def on_pixel(i, coord):
+        progress['done'] = i + 1
+        report.count('pixels')
+        report.count('commits', plan_commits[i])
+        if progress_callback:
+            try:
+                with report.stage('progress_callback'):
+                    progress_callback({
+                        'current': i + 1,
+                        'total': total,
+                        'week': coord['week'],
+                        'day': coord['day'],
+                        'char': coord['char'],
+                        'percentage': round(((i + 1) / total) * 100)
+                    })
+            except Exception:
+                progress['stopped'] = True
+                raise
+    
+    # Blobs and trees already built this run are reused by every later batch. Whether the worker
+    # pool pays off depends on the whole run, not on one checkpoint batch
+    workers = OBJECT_WORKERS if object_workers is None else max(1, object_workers)
+    if sum(plan_commits) + 2 * total < PARALLEL_MIN_OBJECTS:
+        workers = 1
+    cache = ObjectCache(workers)
+    pool_chunks = pool_stats['chunks']
+    
+    def plan_entries(begin, end):
+        # Pixel records are only materialised while a backend consumes them
+        for position, cell, commits in zip(positions[begin:end], cells[begin:end], plan_commits[begin:end]):
+            coord = coordinates[position]
+            target_date = canvas.dates[cell]
+            content = CONSTANT_PAYLOAD if payload == 'constant' else _pixel_payload(coord['week'], coord['day'], target_date)
+            yield coord, commits, target_date, canvas.git_dates[cell], content
+    
+    def checkpoint(done):
+        if not repo.head.is_valid():
+            return
+        
+        with report.stage('checkpoint'):
+            # Record the new commits so the next run doesn't have to rescan history
+            for cell, commits in zip(cells[progress['indexed']:done], plan_commits[progress['indexed']:done]):
+                commit_index.add(canvas.days[cell], commits)
+            progress['indexed'] = done
+            commit_index.head = repo.head.commit.hexsha
+            commit_index.save(index_path(repo))
+            
+            completed = positions[done - 1] + 1 if done else start
+            save_journal(repo, fingerprint, completed, len(coordinates), commit_index.head)
+    
+    if backend == 'object-writer' and total:
+        # Every payload is known up front, so the run's new blobs and trees are built in one go
+        # and the pool sees all of them instead of one batch at a time
+        with report.stage('prepare_objects'):
+            base_entries, base_key = _base_tree(repo)
+            cache.prepare((entry[4] for entry in plan_entries(0, total)), base_key, base_entries, b'data.json')
+    
+    push_stage = PushStage(repo, _current_branch(repo), push_batch_commits) if push == 'batched' and total else None
+    
+    try:
+        for batch_start in range(0, total, checkpoint_every):
+            batch_end = min(batch_start + checkpoint_every, total)
+            backend_commit(
+                repo,
+                plan_entries(batch_start, batch_end),
+                lambda i, coord: on_pixel(batch_start + i, coord),
+                author_name,
+                author_email,
+                report,
+                cache
+            )
+            checkpoint(batch_end)
+            
+            if push_stage:
+                push_stage.notify(commit_index.head, sum(plan_commits[batch_start:batch_end]))
+    except Exception:
+        # A stop requested from the progress callback leaves every reported pixel committed
+        if progress['stopped']:
+            checkpoint(progress['done'])
+        if push_stage:
+            push_stage.close(flush=False)
+        raise
+    
+    clear_journal(repo)
+    report.count('object_cache_hits', cache.hits)
+    report.count('object_cache_misses', cache.misses)
+    report.count('object_worker_chunks', pool_stats['chunks'] - pool_chunks)
+    
+    # The background pusher reads the packs, so let it finish before they are rewritten
+    if push_stage:
+        with report.stage('push_wait'):
+            push_stage.close()
+    
+    pack_result = None
+    if pack and total:
+        with report.stage('pack'):
+            pack_result = pack_repository(repo)
+        report.count('pack_kib_before', pack_result['before']['size'] + pack_result['before']['size_pack'])
+        report.count('pack_kib_after', pack_result['after']['size'] + pack_result['after']['size_pack'])
+    
+    # Push to remote (batched runs have pushed already, unless there was nothing to commit)
+    if not push_stage and push != 'none':
+        push_to_remote(repo, report=report)
+    
+    return {
+        'pixels': total,
+        'commits': sum(plan_commits),
+        'skipped_pixels': len(coordinates) - start - total,
+        'resumed_from': start,
+        'peak': peak,
+        'pack': pack_result
+    }
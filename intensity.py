@@ -0,0 +1,67 @@
+"""
+Shade levels for the contribution graph
+GitHub colours a day by which quarter of the busiest day's count it falls in,
+so a pixel's level (1-4) needs only the smallest count that lands in its bucket
+"""
+
+from pattern_calculator import MAX_LEVEL, MAX_DAYS, PatternPixel
+
+LEVEL_CHARS = {' ': 0, '.': 0}  # Characters besides the digits 0-4 accepted in level grids
+
+
+def commits_for_level(level, peak):
+    """
+    Fewest commits on a day that show level (0-MAX_LEVEL) when the busiest day has peak commits
+    The top level is the peak itself, so plain text keeps exactly `intensity` commits per pixel
+    With peak < MAX_LEVEL there aren't enough counts for every bucket and neighbouring levels merge
+    """
+    if level <= 0:
+        return 0
+    if level >= MAX_LEVEL:
+        return peak
+    return max(1, min(peak, (level - 1) * peak // MAX_LEVEL + 1))
+
+
+def effective_peak(peak, existing_counts=None, days=()):
+    """
+    Scale the levels are drawn against: peak, or the busiest existing day among days if that is higher
+    Existing commits can't be removed, so a busier day elsewhere on the canvas raises every bucket
+    """
+    if existing_counts is None:
+        return peak
+    return max([peak] + [existing_counts.get(day, 0) for day in days])
+
+
+def level_target(coord, peak):
+    """Commits a pixel needs in total for its level (plain text pixels are MAX_LEVEL)"""
+    return commits_for_level(coord.get('level', MAX_LEVEL), peak)
+
+
+def levels_to_pattern(rows):
+    """
+    Convert a grid of levels to pattern pixels, e.g. from an image reduced to 5 shades
+    rows are 7 strings (Sunday first), one character per week: '0'-'4', ' ' or '.' for empty
+    """
+    if len(rows) != MAX_DAYS:
+        raise Exception(f"A level grid needs {MAX_DAYS} rows (Sunday to Saturday), got {len(rows)}")
+
+    pixels = []
+    for week in range(max(len(row) for row in rows)):
+        for day, row in enumerate(rows):
+            char = row[week] if week < len(row) else ' '
+            level = LEVEL_CHARS[char] if char in LEVEL_CHARS else int(char) if char in '01234' else None
+            if level is None:
+                raise Exception(f"Invalid level {char!r} at week {week}, day {day} (use 0-{MAX_LEVEL}, ' ' or '.')")
+            if level:
+                pixels.append(PatternPixel(week, day, '#', 0, level))
+    return pixels
+
+
+def load_levels(path):
+    """Read a level grid file: 7 lines of levels, trailing whitespace ignored"""
+    with open(path) as f:
+        rows = [line.rstrip('\r\n') for line in f]
+    # Ignore trailing blank lines after the grid
+    while len(rows) > MAX_DAYS and not rows[-1].strip():
+        rows.pop()
+    return levels_to_pattern(rows)
@@ -3,15 +3,30 @@ GitHub Contribution Artist - Main GUI Application
 Create beautiful text patterns on your GitHub contribution graph
 """
 
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
+import queue
 import os
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
 from pattern_calculator import (
-    text_to_pattern, validate_text, get_pattern_stats,
-    preview_pattern, get_max_characters
+    CompactPattern, validate_text, get_max_characters, get_pattern_stats,
+    text_to_columns, iter_column_days, MAX_DAYS
 )
+from canvas import ContributionCanvas
 from git_bot import initialize_repo, create_pattern_commits
+from run_report import RunReport, REPORT_FILENAME
+from pack_stage import describe_pack_result
+from planner import plan_run, existing_commit_counts, summarize_plan
+
+PREVIEW_LIT = '#39d353'
+PREVIEW_EMPTY = '#161b22'
+MAX_CANVAS_YEARS = 7  # Upper bound of the canvas length spinbox: 365 columns at the 2px minimum pitch fit the 900px window
+PREVIEW_DEBOUNCE_MS = 150  # Quiet time after the last edit before the preview is recomputed
+UI_FRAME_MS = 33  # Queued log/progress events are applied at most ~30 times per second
+TARGET_DIR = os.path.join(os.path.expanduser('~'), 'github-contribution-repo')
 
 
 class GitHubContributionArtist:
@@ -25,13 +40,31 @@ class GitHubContributionArtist:
         self.repo_url = tk.StringVar()
         self.text_input = tk.StringVar()
         self.intensity = tk.IntVar(value=1)
+        self.years = tk.IntVar(value=1)
         self.is_running = False
         
+        # Preview state: one rectangle per cell, updated in place
+        self.preview_cells = []
+        self.preview_columns = []
+        self.preview_geometry = None
+        self.preview_text = ''
+        self.preview_weeks = ContributionCanvas.last_year().weeks
+        self.canvas_key = None
+        self.current = None
+        self.preview_after_id = None
+        self.preview_generation = 0
+        self.preview_executor = ThreadPoolExecutor(max_workers=1)
+        
+        # Log/progress events and calls posted by worker threads (generation, preview), applied by drain_events
+        self.events = queue.Queue()
+        
         # Setup UI
         self.setup_ui()
+        self.root.after(UI_FRAME_MS, self.drain_events)
         
-        # Bind text input changes
+        # Bind text input and canvas length changes
         self.text_input.trace('w', self.on_text_change)
+        self.years.trace('w', self.on_text_change)
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -80,14 +113,14 @@ class GitHubContributionArtist:
         text_frame = tk.Frame(main_frame, bg='#0d1117')
         text_frame.pack(fill=tk.X, pady=(0, 15))
         
-        text_label = tk.Label(
+        self.text_label = tk.Label(
             text_frame,
             text=f"Text to Draw (Max {get_max_characters()} characters):",
             font=('Segoe UI', 11),
             bg='#0d1117',
             fg='#c9d1d9'
         )
-        text_label.pack(anchor=tk.W, pady=(0, 5))
+        self.text_label.pack(anchor=tk.W, pady=(0, 5))
         
         text_entry = tk.Entry(
             text_frame,
@@ -113,6 +146,17 @@ class GitHubContributionArtist:
         )
         self.stats_label.pack(anchor=tk.W, pady=(5, 0))
         
+        # Dry-run estimate for the current settings
+        self.plan_label = tk.Label(
+            text_frame,
+            text="",
+            font=('Segoe UI', 9),
+            bg='#0d1117',
+            fg='#8b949e',
+            justify=tk.LEFT
+        )
+        self.plan_label.pack(anchor=tk.W)
+        
         # Intensity slider
         intensity_frame = tk.Frame(main_frame, bg='#0d1117')
         intensity_frame.pack(fill=tk.X, pady=(0, 15))
@@ -156,6 +200,35 @@ class GitHubContributionArtist:
         )
         intensity_slider.pack(side=tk.LEFT, fill=tk.X, expand=True)
         
+        # Canvas length
+        years_frame = tk.Frame(main_frame, bg='#0d1117')
+        years_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        years_label = tk.Label(
+            years_frame,
+            text="Graph Length (years, ending today):",
+            font=('Segoe UI', 11),
+            bg='#0d1117',
+            fg='#c9d1d9'
+        )
+        years_label.pack(side=tk.LEFT)
+        
+        years_spinbox = tk.Spinbox(
+            years_frame,
+            from_=1,
+            to=MAX_CANVAS_YEARS,
+            textvariable=self.years,
+            width=4,
+            font=('Segoe UI', 11, 'bold'),
+            bg='#161b22',
+            fg='#58a6ff',
+            buttonbackground='#161b22',
+            relief=tk.FLAT,
+            state='readonly',
+            readonlybackground='#161b22'
+        )
+        years_spinbox.pack(side=tk.LEFT, padx=(10, 0))
+        
         # Preview Canvas
         preview_frame =tk.LabelFrame(
             main_frame,
@@ -175,6 +248,7 @@ class GitHubContributionArtist:
             height=150
         )
         self.canvas.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.canvas.bind('<Configure>', self.on_canvas_resize)
         
         # Control Buttons
         button_frame = tk.Frame(main_frame, bg='#0d1117')
@@ -251,44 +325,135 @@ class GitHubContributionArtist:
         self.on_text_change()
     
     def on_text_change(self, *args):
-        """Called when text input changes"""
-        text = self.text_input.get()
-        
-        if not text:
-            self.stats_label.config(text="")
-            self.canvas.delete('all')
+        """Called when text input changes; bursts of edits are coalesced into one preview update"""
+        if self.preview_after_id is not None:
+            self.root.after_cancel(self.preview_after_id)
+        self.preview_after_id = self.root.after(PREVIEW_DEBOUNCE_MS, self.request_preview)
+    
+    def current_canvas(self):
+        """Canvas for the selected graph length, rebuilt only when the length or the day changes"""
+        key = (self.years.get(), date.today())
+        if self.canvas_key != key:
+            self.canvas_key = key
+            self.current = ContributionCanvas.for_years(key[0], key[1])
+        return self.current
+    
+    def request_preview(self):
+        """Compute the preview for the current text on the worker thread"""
+        self.preview_after_id = None
+        self.preview_generation += 1
+        canvas = self.current_canvas()
+        self.text_label.config(text=f"Text to Draw (Max {get_max_characters(canvas.weeks)} characters):")
+        self.preview_executor.submit(self.compute_preview, self.preview_generation, self.text_input.get(), canvas, self.intensity.get())
+    
+    def compute_preview(self, generation, text, canvas, intensity):
+        """Worker thread: validate, count, plan and render text, then hand the result to the main loop"""
+        weeks = canvas.weeks
+        valid, message, stats, columns, plan = False, "", None, (), None
+        
+        if text:
+            valid, message = validate_text(text, weeks, canvas.last_week_days)
+            if valid:
+                stats = get_pattern_stats(text, weeks)
+                columns = text_to_columns(text)
+                try:
+                    existing_counts = existing_commit_counts(TARGET_DIR)
+                except Exception:
+                    existing_counts = None
+                try:
+                    # Planned like run_generation runs: incremental on top of the local clone
+                    plan = plan_run(CompactPattern.from_text(text), intensity, canvas, existing_counts=existing_counts)
+                except Exception as e:
+                    # e.g. pixels in the current week's days that haven't happened yet
+                    valid, message = False, str(e)
+        
+        # Tk widgets may only be touched from the main loop
+        self.call_in_main_loop(self.paint_preview, generation, text, weeks, valid, message, stats, columns, plan)
+    
+    def paint_preview(self, generation, text, weeks, valid, message, stats, columns, plan=None):
+        """Main loop: show a computed preview unless newer text has been typed since"""
+        if generation != self.preview_generation:
             return
         
-        # Validate
-        valid, message = validate_text(text)
+        self.preview_weeks = weeks
+        
+        self.plan_label.config(text=summarize_plan(plan) if valid and plan else "")
         
-        if valid:
-            stats = get_pattern_stats(text)
+        if not text:
+            self.stats_label.config(text="")
+            self.clear_preview()
+        elif valid:
             self.stats_label.config(
                 text=f"✓ {stats['characters']} chars | {stats['commits']} commits | {stats['weeks']} weeks",
                 fg='#3fb950'
             )
-            self.draw_preview(text)
+            self.draw_preview(text, columns)
         else:
             self.stats_label.config(text=f"✗ {message}", fg='#f85149')
-            self.canvas.delete('all')
+            self.clear_preview()
     
     def on_intensity_change(self, value):
         """Called when intensity slider changes"""
         self.intensity_value_label.config(text=str(value))
+        self.on_text_change()
+    
+    def on_canvas_resize(self, event):
+        """Rebuild the preview for the new canvas size"""
+        if self.preview_text:
+            self.draw_preview(self.preview_text)
     
-    def draw_preview(self, text):
-        """Draw pattern preview on canvas"""
+    def clear_preview(self):
+        """Remove all preview cells"""
         self.canvas.delete('all')
+        self.preview_cells = []
+        self.preview_columns = []
+        self.preview_geometry = None
+        self.preview_text = ''
+    
+    def build_preview_cells(self, canvas_width, canvas_height, cols):
+        """Create the cell rectangles for a canvas size and column count"""
+        self.canvas.delete('all')
+        rows = MAX_DAYS
+        
+        # Calculate cell pitch to fit canvas; multi-year canvases shrink cells and gaps down to 2px
+        pitch = max(2, min(17, (canvas_width - 20) // cols, (canvas_height - 20) // rows))
+        gap = 2 if pitch >= 5 else 1
+        cell_size = pitch - gap
+        
+        # Center the grid
+        start_x = (canvas_width - (cols * pitch)) // 2
+        start_y = (canvas_height - (rows * pitch)) // 2
+        
+        self.preview_cells = []
+        for row in range(rows):
+            cells = []
+            for col in range(cols):
+                x = start_x + col * pitch
+                y = start_y + row * pitch
+                
+                cells.append(self.canvas.create_rectangle(
+                    x, y,
+                    x + cell_size, y + cell_size,
+                    fill=PREVIEW_EMPTY,
+                    outline='#0d1117' if gap > 1 else '',
+                    width=1
+                ))
+            self.preview_cells.append(cells)
         
-        grid = preview_pattern(text)
-        if not grid:
+        self.preview_columns = [0] * cols
+        self.preview_geometry = (canvas_width, canvas_height, cols)
+    
+    def draw_preview(self, text, columns=None):
+        """Draw pattern preview on canvas, recolouring only the cells that changed"""
+        if columns is None:
+            columns = text_to_columns(text)
+        if not columns:
+            self.clear_preview()
             return
         
-        rows = len(grid)
-        cols = len(grid[0]) if grid else 0
+        # Always show at least the full canvas so typing doesn't reflow the grid
+        cols = max(self.preview_weeks, len(columns))
         
-        # Calculate cell size to fit canvas
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
         
@@ -296,35 +461,70 @@ class GitHubContributionArtist:
             canvas_width = 800
             canvas_height = 150
         
-        cell_width = max(3, min(15, (canvas_width - 20) // cols))
-        cell_height = max(3, min(15, (canvas_height - 20) // rows))
-        cell_size = min(cell_width, cell_height)
+        if self.preview_geometry != (canvas_width, canvas_height, cols):
+            self.build_preview_cells(canvas_width, canvas_height, cols)
+        self.preview_text = text
         
-        # Center the grid
-        start_x = (canvas_width - (cols * (cell_size + 2))) // 2
-        start_y = (canvas_height - (rows * (cell_size + 2))) // 2
-        
-        # Draw grid
-        for row in range(rows):
-            for col in range(cols):
-                x = start_x + col * (cell_size + 2)
-                y = start_y + row * (cell_size + 2)
-                
-                color = '#39d353' if grid[row][col] == 1 else '#161b22'
-                
-                self.canvas.create_rectangle(
-                    x, y,
-                    x + cell_size, y + cell_size,
-                    fill=color,
-                    outline='#0d1117',
-                    width=1
-                )
+        for col in range(cols):
+            mask = columns[col] if col < len(columns) else 0
+            changed = mask ^ self.preview_columns[col]
+            if not changed:
+                continue
+            
+            for row in iter_column_days(changed):
+                color = PREVIEW_LIT if (mask >> row) & 1 else PREVIEW_EMPTY
+                self.canvas.itemconfig(self.preview_cells[row][col], fill=color)
+            self.preview_columns[col] = mask
     
     def log(self, message):
-        """Add message to log"""
-        self.log_text.insert(tk.END, message + '\n')
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        """Queue a log line; safe to call from any thread"""
+        self.events.put(('log', message))
+    
+    def set_progress(self, value):
+        """Queue a progress bar update; safe to call from any thread"""
+        self.events.put(('progress', value))
+    
+    def call_in_main_loop(self, func, *args):
+        """Queue a call that has to run on the Tk main loop"""
+        self.events.put(('call', func, args))
+    
+    def drain_events(self):
+        """
+        Main loop timer: apply queued events once per UI frame
+        Log lines are joined into a single insert and only the latest progress value is shown
+        """
+        lines = []
+        progress = None
+        calls = []
+        
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            
+            if event[0] == 'log':
+                lines.append(event[1])
+            elif event[0] == 'progress':
+                progress = event[1]
+            else:
+                calls.append(event)
+        
+        # Re-arm even if a widget call fails, or every later event would be lost
+        try:
+            if lines:
+                self.log_text.insert(tk.END, '\n'.join(lines) + '\n')
+                self.log_text.see(tk.END)
+            if progress is not None:
+                self.progress['value'] = progress
+            for _, func, args in calls:
+                try:
+                    func(*args)
+                except Exception:
+                    # Report it like a failing Tk callback and keep applying the remaining calls
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            self.root.after(UI_FRAME_MS, self.drain_events)
     
     def start_generation(self):
         """Start pattern generation"""
@@ -340,7 +540,8 @@ class GitHubContributionArtist:
             return
         
         # Validate text
-        valid, message = validate_text(text)
+        canvas = self.current_canvas()
+        valid, message = validate_text(text, canvas.weeks, canvas.last_week_days)
         if not valid:
             messagebox.showerror("Error", message)
             return
@@ -355,33 +556,39 @@ class GitHubContributionArtist:
         self.progress['value'] = 0
         
         # Start in thread
-        thread = threading.Thread(target=self.run_generation, args=(repo_url, text))
+        thread = threading.Thread(target=self.run_generation, args=(repo_url, text, self.intensity.get(), canvas))
         thread.daemon = True
         thread.start()
     
-    def run_generation(self, repo_url, text):
-        """Run the generation process"""
+    def run_generation(self, repo_url, text, intensity, canvas):
+        """Run the generation process (worker thread: talks to widgets only through the event queue)"""
         try:
             self.log(f"🎨 Creating pattern: '{text}'")
             self.log(f"📦 Repository: {repo_url}")
-            self.log(f"💪 Intensity: {self.intensity.get()} commits/pixel\n")
+            self.log(f"💪 Intensity: {intensity} commits/pixel")
+            self.log(f"📅 Graph: {canvas.start.isoformat()} to {canvas.end.isoformat()} ({canvas.weeks} weeks)\n")
+            
+            report = RunReport()
             
             # Get pattern
-            coordinates = text_to_pattern(text)
+            with report.stage('pattern'):
+                coordinates = CompactPattern.from_text(text)
             total = len(coordinates)
             
             self.log(f"📊 Pattern statistics:")
             self.log(f"   - Text: {text}")
-            self.log(f"   - Commits needed: {total}")
-            self.log(f"   - Intensity: {self.intensity.get()}x")
-            self.log(f"   - Total commits: {total * self.intensity.get()}\n")
+            self.log(f"   - Pixels: {total}")
+            self.log(f"   - Intensity: {intensity}x\n")
             
             # Initialize repo
-            target_dir = os.path.join(os.path.expanduser('~'), 'github-contribution-repo')
+            target_dir = TARGET_DIR
             self.log(f"📂 Initializing repository at: {target_dir}")
             
-            repo = initialize_repo(repo_url, target_dir)
-            self.log(f"✓ Repository initialized\n")
+            repo = initialize_repo(repo_url, target_dir, report)
+            self.log(f"✓ Repository initialized")
+            
+            plan = plan_run(coordinates, intensity, canvas, existing_counts=existing_commit_counts(target_dir))
+            self.log(f"📋 {summarize_plan(plan)}\n")
             
             # Create commits
             self.log("🚀 Starting commit generation...\n")
@@ -390,15 +597,34 @@ class GitHubContributionArtist:
                 if not self.is_running:
                     raise Exception("Generation stopped by user")
                 
-                self.progress['value'] = progress['percentage']
+                self.set_progress(progress['percentage'])
                 self.log(f"[{progress['current']}/{progress['total']}] '{progress['char']}' at Week {progress['week']}, Day {progress['day']}")
             
-            create_pattern_commits(
+            result = create_pattern_commits(
                 repo,
                 coordinates,
-                self.intensity.get(),
-                progress_callback
+                intensity,
+                progress_callback,
+                incremental=True,
+                report=report,
+                canvas=canvas
             )
+            report.finish()
+            
+            if result['resumed_from']:
+                self.log(f"\n↻ Resumed interrupted run at pixel {result['resumed_from'] + 1}/{total}")
+            self.log(f"\n✓ Created {result['commits']} commits on {result['pixels']} days")
+            if result['skipped_pixels']:
+                self.log(f"⏭ {result['skipped_pixels']} pixels already drawn")
+            if result['pack']:
+                self.log(f"\n📦 Packed repository: {describe_pack_result(result['pack'])}")
+            
+            report_path = os.path.join(repo.git_dir, REPORT_FILENAME)
+            report.write(report_path)
+            self.log("")
+            for line in report.summary_lines():
+                self.log(line)
+            self.log(f"   Report: {report_path}")
             
             self.log(f"\n✅ Pattern '{text}' created successfully!")
             self.log(f"📁 Repository location: {target_dir}")
@@ -406,17 +632,21 @@ class GitHubContributionArtist:
             self.log("1. Enable 'Private contributions' in your GitHub profile settings")
             self.log("2. Wait a few minutes for GitHub to update your contribution graph")
             
-            messagebox.showinfo("Success", f"Pattern '{text}' created successfully!\n\nCheck your GitHub profile in a few minutes.")
+            self.call_in_main_loop(messagebox.showinfo, "Success", f"Pattern '{text}' created successfully!\n\nCheck your GitHub profile in a few minutes.")
             
         except Exception as e:
             self.log(f"\n❌ Error: {str(e)}")
-            messagebox.showerror("Error", f"Failed to create pattern:\n{str(e)}")
+            self.call_in_main_loop(messagebox.showerror, "Error", f"Failed to create pattern:\n{str(e)}")
         
         finally:
-            self.generate_btn.config(state=tk.NORMAL)
-            self.stop_btn.config(state=tk.DISABLED)
             self.is_running = False
-            self.progress['value'] = 0
+            self.call_in_main_loop(self.finish_generation)
+    
+    def finish_generation(self):
+        """Reset the controls once a run has ended"""
+        self.generate_btn.config(state=tk.NORMAL)
+        self.stop_btn.config(state=tk.DISABLED)
+        self.progress['value'] = 0
     
     def stop_generation(self):
         """Stop the generation process"""
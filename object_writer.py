@@ -0,0 +1,323 @@
+"""
+In-process git object writer
+Builds blobs, trees and commits in memory and writes each batch of them as one packfile
+"""
+
+import os
+import zlib
+import struct
+import hashlib
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+
+TYPE_NAMES = {
+    OBJ_COMMIT: b'commit',
+    OBJ_TREE: b'tree',
+    OBJ_BLOB: b'blob',
+}
+
+OBJECT_WORKERS = os.cpu_count() or 1  # Default worker processes for hashing and compression
+PARALLEL_MIN_OBJECTS = 512  # Runs creating fewer objects are cheaper to process inline than to ship to workers
+PARALLEL_CHUNK_OBJECTS = 64  # Smallest chunk sent to a worker, so pickling doesn't dominate
+
+
+def hash_object(obj_type, data):
+    """Return the binary SHA-1 git would assign to an object"""
+    header = b'%s %d\x00' % (TYPE_NAMES[obj_type], len(data))
+    return hashlib.sha1(header + data).digest()
+
+
+def parse_tree(data):
+    """Parse raw tree object data into a list of (mode, name, binsha) entries"""
+    entries = []
+    pos = 0
+    while pos < len(data):
+        space = data.index(b' ', pos)
+        nul = data.index(b'\x00', space)
+        mode = data[pos:space]
+        name = data[space + 1:nul]
+        entries.append((mode, name, data[nul + 1:nul + 21]))
+        pos = nul + 21
+    return entries
+
+
+def serialize_tree(entries):
+    """Serialize (mode, name, binsha) entries in git's tree order"""
+    def sort_key(entry):
+        mode, name, _ = entry
+        # Git compares directory names as if they ended with '/'
+        return name + b'/' if mode == b'40000' else name
+
+    return b''.join(b'%s %s\x00%s' % entry for entry in sorted(entries, key=sort_key))
+
+
+def serialize_commit(tree, parent, author_line, committer_line, message):
+    """
+    Serialize a commit object the way GitPython's index.commit does
+    tree and parent are hex SHAs, the identity lines are 'Name <email> <timestamp> <+hhmm>'
+    """
+    lines = [b'tree ' + tree.encode('ascii')]
+    if parent:
+        lines.append(b'parent ' + parent.encode('ascii'))
+    lines.append(b'author ' + author_line.encode('utf-8'))
+    lines.append(b'committer ' + committer_line.encode('utf-8'))
+    return b'\n'.join(lines) + b'\n\n' + message.encode('utf-8')
+
+
+def _pack_entry_header(obj_type, size):
+    """Variable-length type/size header of a packed object"""
+    byte = (obj_type << 4) | (size & 0x0f)
+    size >>= 4
+    header = bytearray()
+    while size:
+        header.append(byte | 0x80)
+        byte = size & 0x7f
+        size >>= 7
+    header.append(byte)
+    return bytes(header)
+
+
+def _pack_object(obj_type, data, compression):
+    """Pack entry (header + zlib data) of an object"""
+    return _pack_entry_header(obj_type, len(data)) + zlib.compress(data, compression)
+
+
+def _compress_objects(objects, compression):
+    """Worker: pack entries for a list of (obj_type, data)"""
+    return [_pack_object(obj_type, data, compression) for obj_type, data in objects]
+
+
+def _prepare_blob_trees(payloads, base_entries, name, compression):
+    """
+    Worker: hash and pack the blob of each payload and the tree holding it next to base_entries
+    Returns one (blob binsha, blob entry, tree binsha, tree entry) tuple per payload
+    """
+    prepared = []
+    for payload in payloads:
+        blob = hash_object(OBJ_BLOB, payload)
+        tree_data = serialize_tree(base_entries + [(b'100644', name, blob)])
+        prepared.append((
+            blob, _pack_object(OBJ_BLOB, payload, compression),
+            hash_object(OBJ_TREE, tree_data), _pack_object(OBJ_TREE, tree_data, compression)
+        ))
+    return prepared
+
+
+_pool = None
+_pool_workers = 0
+pool_stats = {'chunks': 0}  # Chunks parallel_map sent to the pool
+
+
+def _worker_pool(workers):
+    """Process pool shared by all writers, recreated only when the worker count changes"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown()
+
+
+def parallel_map(func, items, workers, *args):
+    """
+    func(items, *args) computed in chunks on the worker pool, results concatenated in order
+    Runs inline for a single worker or when the items fit in one chunk
+    Whether a run is worth the pool at all is up to the caller, see PARALLEL_MIN_OBJECTS
+    """
+    if workers <= 1 or len(items) <= PARALLEL_CHUNK_OBJECTS:
+        return func(items, *args)
+
+    # A few chunks per worker keeps them busy while amortising the pickling of tiny objects
+    chunk_size = max(PARALLEL_CHUNK_OBJECTS, -(-len(items) // (workers * 4)))
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    pool = _worker_pool(workers)
+    pool_stats['chunks'] += len(chunks)
+    results = []
+    for chunk_result in pool.map(func, chunks, *[[arg] * len(chunks) for arg in args]):
+        results.extend(chunk_result)
+    return results
+
+
+class PackWriter:
+    """
+    Collects objects in memory and writes them as one pack + index (version 2)
+    Objects are deduplicated by SHA, so re-adding an identical tree or blob is free
+    Objects added with defer=True are only hashed; their compression is spread over
+    `workers` processes when the pack is written
+    """
+
+    def __init__(self, git_dir, compression=zlib.Z_DEFAULT_COMPRESSION, workers=1):
+        self.git_dir = git_dir
+        self.compression = compression
+        self.workers = workers
+        self.entries = {}
+        self.pending = {}
+        self.bytes_written = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, obj_type, data, defer=False):
+        """Add an object and return its hex SHA"""
+        binsha = hash_object(obj_type, data)
+        if binsha not in self.entries:
+            if defer:
+                # Placeholder keeps the pack in insertion order
+                self.entries[binsha] = None
+                self.pending[binsha] = (obj_type, data)
+            else:
+                self.entries[binsha] = _pack_object(obj_type, data, self.compression)
+        return binsha.hex()
+
+    def add_packed(self, binsha, packed):
+        """Add an object already hashed and packed (e.g. by a worker)"""
+        if binsha not in self.entries:
+            self.entries[binsha] = packed
+
+    def _compress_pending(self):
+        if not self.pending:
+            return
+        packed = parallel_map(_compress_objects, list(self.pending.values()), self.workers, self.compression)
+        for binsha, entry in zip(self.pending, packed):
+            self.entries[binsha] = entry
+        self.pending = {}
+
+    def write(self):
+        """
+        Write the collected objects to objects/pack and return the pack path
+        Returns None when there is nothing to write
+        """
+        if not self.entries:
+            return None
+        self._compress_pending()
+
+        pack_dir = os.path.join(self.git_dir, 'objects', 'pack')
+        os.makedirs(pack_dir, exist_ok=True)
+
+        # Pack body: header, entries, SHA-1 trailer
+        pack_sha = hashlib.sha1()
+        chunks = [b'PACK' + struct.pack('>II', 2, len(self.entries))]
+        offsets = {}
+        crcs = {}
+        offset = len(chunks[0])
+        for binsha, packed in self.entries.items():
+            offsets[binsha] = offset
+            crcs[binsha] = zlib.crc32(packed)
+            chunks.append(packed)
+            offset += len(packed)
+        for chunk in chunks:
+            pack_sha.update(chunk)
+        pack_checksum = pack_sha.digest()
+
+        # Index: fanout table, sorted SHAs, CRCs, offsets, checksums
+        shas = sorted(self.entries)
+        fanout = [0] * 256
+        for binsha in shas:
+            fanout[binsha[0]] += 1
+        total = 0
+        for i in range(256):
+            total += fanout[i]
+            fanout[i] = total
+
+        large_offsets = []
+        offset_table = []
+        for binsha in shas:
+            entry_offset = offsets[binsha]
+            if entry_offset < 0x80000000:
+                offset_table.append(struct.pack('>I', entry_offset))
+            else:
+                offset_table.append(struct.pack('>I', 0x80000000 | len(large_offsets)))
+                large_offsets.append(struct.pack('>Q', entry_offset))
+
+        index = b''.join([
+            b'\xfftOc' + struct.pack('>I', 2),
+            struct.pack('>256I', *fanout),
+            b''.join(shas),
+            b''.join(struct.pack('>I', crcs[binsha]) for binsha in shas),
+            b''.join(offset_table),
+            b''.join(large_offsets),
+            pack_checksum,
+        ])
+        index += hashlib.sha1(index).digest()
+
+        # Write the pack before its index so readers never see a dangling .idx
+        base = os.path.join(pack_dir, f"pack-{pack_checksum.hex()}")
+        with open(base + '.pack', 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.write(pack_checksum)
+        with open(base + '.idx', 'wb') as f:
+            f.write(index)
+
+        self.bytes_written = offset + len(pack_checksum) + len(index)
+        return base + '.pack'
+
+
+class ObjectCache:
+    """
+    Content-addressed cache of the blobs and trees written during one run
+    Payloads map to their blob id and (base tree, blob) pairs to their tree id, so repeated
+    content is serialized, hashed and compressed once even when later batches go to new packs
+    prepare() builds new content up front on `workers` processes; take() adds an object to a
+    pack only when a commit first uses it, so a stopped run doesn't write unused objects
+    tip_payload / tip_tree remember the content at the branch tip, for backends that can simply
+    reuse the parent's tree when a pixel doesn't change data.json
+    """
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.blobs = {}
+        self.trees = {}
+        self.packed = {}
+        self.tip_payload = None
+        self.tip_tree = None
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(self, payloads, base_key, base_entries, name, compression=zlib.Z_DEFAULT_COMPRESSION):
+        """
+        Hash and compress the blob of each payload not seen before and the tree holding it
+        next to base_entries; the pack entries wait in self.packed until take() needs them
+        """
+        missing = []
+        for payload in dict.fromkeys(payloads):
+            blob = self.blobs.get(payload)
+            if blob is None or (base_key, blob) not in self.trees:
+                missing.append(payload)
+
+        prepared = parallel_map(_prepare_blob_trees, missing, self.workers, base_entries, name, compression)
+        for payload, (blob, blob_entry, tree, tree_entry) in zip(missing, prepared):
+            self.blobs[payload] = blob.hex()
+            self.trees[(base_key, blob.hex())] = tree.hex()
+            self.packed[blob.hex()] = blob_entry
+            self.packed[tree.hex()] = tree_entry
+
+    def take(self, writer, payload, base_key):
+        """
+        Id of the prepared tree for payload; its blob and tree are added to writer the first time
+        A pixel whose objects were already written counts as a hit, otherwise as a miss
+        """
+        blob = self.blobs[payload]
+        tree = self.trees[(base_key, blob)]
+        written = False
+        for sha in (blob, tree):
+            entry = self.packed.pop(sha, None)
+            if entry is not None:
+                writer.add_packed(bytes.fromhex(sha), entry)
+                written = True
+        if written:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return tree
@@ -0,0 +1,63 @@
+"""
+Pack stage: compact a generated repository after a run
+Loose objects and the per-batch packs of earlier runs are folded into few packfiles,
+so opening the repository, scanning history and pushing stay fast as runs accumulate
+"""
+
+import time
+
+# Generated objects are tiny and near-identical (commits differ in date and parent only),
+# so a wide delta window finds good bases cheaply
+PACK_WINDOW = 50
+PACK_DEPTH = 50
+GEOMETRIC_FACTOR = 2  # Each pack is at least twice the size of the next smaller one after a repack
+FULL_REPACK_OBJECTS = 50000  # Up to this many objects a full repack with fresh deltas takes well under a second
+
+
+def repository_size(repo):
+    """Object counts and sizes from `git count-objects -v` (sizes in KiB)"""
+    sizes = {}
+    for line in repo.git.count_objects('-v').splitlines():
+        key, value = line.split(':', 1)
+        sizes[key.strip().replace('-', '_')] = int(value)
+    return sizes
+
+
+def pack_repository(repo, window=PACK_WINDOW, depth=PACK_DEPTH, full=None):
+    """
+    Pack loose objects and consolidate packs
+    A geometric repack only rewrites the small, recent packs, so the cost follows the new objects
+    rather than the whole history; a full repack rewrites everything with fresh deltas
+    full=None picks a full repack for repositories of up to FULL_REPACK_OBJECTS objects
+    Also packs refs and writes the commit-graph file used by history walks
+    Returns {'before', 'after', 'full', 'seconds'} with repository_size() snapshots
+    """
+    start = time.perf_counter()
+    before = repository_size(repo)
+    if full is None:
+        full = before['count'] + before['in_pack'] <= FULL_REPACK_OBJECTS
+
+    if full:
+        repo.git.repack('-a', '-d', '-f', f'--window={window}', f'--depth={depth}')
+    else:
+        repo.git.repack('-d', f'--geometric={GEOMETRIC_FACTOR}', f'--window={window}', f'--depth={depth}')
+    # Loose copies of objects that are now packed
+    repo.git.prune_packed()
+    repo.git.pack_refs('--all')
+    repo.git.commit_graph('write', '--reachable')
+
+    return {
+        'before': before,
+        'after': repository_size(repo),
+        'full': full,
+        'seconds': round(time.perf_counter() - start, 6)
+    }
+
+
+def describe_pack_result(result):
+    """One-line summary of a pack_repository result"""
+    before, after = result['before'], result['after']
+    return (
+        f"{before['count']} loose objects ({before['size']} KiB) + {before['packs']} packs ({before['size_pack']} KiB)"
+        f" -> {after['count']} loose + {after['packs']} packs ({after['size_pack']} KiB) in {result['seconds']:.2f}s"
+    )
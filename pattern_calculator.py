@@ -3,13 +3,19 @@ Pattern calculator for GitHub contribution graph
 Converts text to grid coordinates
 """
 
-from fonts import FONTS, UNKNOWN_CHAR
+import threading
+from array import array
+from collections import OrderedDict
+from fonts import GLYPH_COLUMNS, UNKNOWN_GLYPH_COLUMNS
 
 CHAR_WIDTH = 5  # Each character is 5 pixels wide
 CHAR_HEIGHT = 7  # Each character is 7 pixels tall
 CHAR_SPACING = 1  # 1 week spacing between characters
 MAX_WEEKS = 53  # GitHub contribution graph is 53 weeks wide
 MAX_DAYS = 7  # 7 days per week
+MAX_LEVEL = 4  # GitHub's darkest colour bucket; text pixels are drawn at this level
+RENDER_CACHE_SIZE = 256  # Rendered texts kept by the LRU render cache
+PREFIX_LOOKBACK = 8  # Trailing characters the cache strips when looking for a rendered prefix
 
 
 def calculate_required_weeks(text):
@@ -19,25 +25,130 @@ def calculate_required_weeks(text):
     return (len(text) * (CHAR_WIDTH + CHAR_SPACING)) - CHAR_SPACING
 
 
-def get_max_characters():
-    """Calculate maximum characters that fit in the grid"""
-    return (MAX_WEEKS + CHAR_SPACING) // (CHAR_WIDTH + CHAR_SPACING)
+def get_max_characters(max_weeks=MAX_WEEKS):
+    """Calculate maximum characters that fit in a grid of max_weeks columns"""
+    return (max_weeks + CHAR_SPACING) // (CHAR_WIDTH + CHAR_SPACING)
 
 
-def validate_text(text):
-    """Validate if text fits in the contribution graph"""
+def validate_text(text, max_weeks=MAX_WEEKS, last_week_days=MAX_DAYS):
+    """
+    Validate if text fits in a contribution graph of max_weeks columns (see canvas.ContributionCanvas.weeks)
+    The last column only has its first last_week_days days (canvas.last_week_days), so text that
+    reaches it may only light those
+    """
     if not text or not text.strip():
         return False, "Please enter some text"
     
     required = calculate_required_weeks(text)
-    max_chars = get_max_characters()
+    max_chars = get_max_characters(max_weeks)
     
-    if required > MAX_WEEKS:
-        return False, f"Text too long! Max {max_chars} chars (needs {required} weeks, max {MAX_WEEKS})"
+    if required > max_weeks:
+        return False, f"Text too long! Max {max_chars} chars (needs {required} weeks, max {max_weeks})"
+    
+    if required == max_weeks and text_to_columns(text)[-1] >> last_week_days:
+        return False, f"Text too long! Its last column lights days after the graph's end (its last week has {last_week_days} of 7 days)"
     
     return True, "OK"
 
 
+class RenderCache:
+    """
+    LRU cache of rendered column masks keyed by (text, font, layout)
+    A miss extends the longest cached prefix, so typing one more character only renders the new glyph
+    """
+
+    def __init__(self, maxsize=RENDER_CACHE_SIZE, font='default', glyphs=GLYPH_COLUMNS, unknown_glyph=UNKNOWN_GLYPH_COLUMNS):
+        self.maxsize = maxsize
+        self.font = font
+        self.glyphs = glyphs
+        self.unknown_glyph = unknown_glyph
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+    def _key(self, upper_text):
+        return (upper_text, self.font, (CHAR_WIDTH, CHAR_SPACING))
+
+    def columns(self, text):
+        """Column masks for text, as an immutable tuple (safe to call from several threads)"""
+        with self.lock:
+            return self._columns(text.upper())
+
+    def _columns(self, upper_text):
+        key = self._key(upper_text)
+        
+        cached = self.entries.get(key)
+        if cached is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return cached
+        
+        self.misses += 1
+        prefix_columns, start = self._cached_prefix(upper_text)
+        columns = list(prefix_columns)
+        for char_index in range(start, len(upper_text)):
+            if char_index:
+                columns.extend([0] * CHAR_SPACING)
+            columns.extend(self.glyphs.get(upper_text[char_index], self.unknown_glyph))
+        
+        columns = tuple(columns)
+        self.entries[key] = columns
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return columns
+
+    def _cached_prefix(self, upper_text):
+        """Longest cached rendering of a prefix of upper_text, and its length in characters"""
+        shortest = max(1, len(upper_text) - PREFIX_LOOKBACK)
+        for length in range(len(upper_text) - 1, shortest - 1, -1):
+            key = self._key(upper_text[:length])
+            cached = self.entries.get(key)
+            if cached is not None:
+                self.entries.move_to_end(key)
+                self.prefix_hits += 1
+                return cached, length
+        return (), 0
+
+    def stats(self):
+        """Hit/miss counters; prefix_hits counts misses that reused a cached prefix"""
+        return {
+            'hits': self.hits,
+            'prefix_hits': self.prefix_hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+            'maxsize': self.maxsize
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        self.hits = self.prefix_hits = self.misses = 0
+
+
+render_cache = RenderCache()
+
+
+def text_to_columns(text):
+    """
+    Convert text to packed week columns, spacing columns included
+    Each column is a 7-bit mask, bit n set when day n is lit
+    Results come from the shared render_cache
+    """
+    if not text:
+        return ()
+    return render_cache.columns(text)
+
+
+def iter_column_days(mask):
+    """Yield the lit days of a column mask in ascending order"""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
 def text_to_pattern(text):
     """
     Convert text to pattern coordinates
@@ -51,19 +162,17 @@ def text_to_pattern(text):
     current_week = 0
     
     for char_index, char in enumerate(upper_text):
-        font = FONTS.get(char, UNKNOWN_CHAR)
+        glyph = GLYPH_COLUMNS.get(char, UNKNOWN_GLYPH_COLUMNS)
         
-        # For each column in the character (5 columns wide)
-        for col in range(CHAR_WIDTH):
-            # For each row (7 rows tall, days 0-6)
-            for row in range(CHAR_HEIGHT):
-                if font[row][col] == 1:
-                    coordinates.append({
-                        'week': current_week + col,
-                        'day': row,
-                        'char': char,
-                        'char_index': char_index
-                    })
+        # For each column in the character, emit only the lit days
+        for col, mask in enumerate(glyph):
+            for day in iter_column_days(mask):
+                coordinates.append({
+                    'week': current_week + col,
+                    'day': day,
+                    'char': char,
+                    'char_index': char_index
+                })
         
         # Move to next character position (width + spacing)
         current_week += CHAR_WIDTH + CHAR_SPACING
@@ -71,6 +180,96 @@ def text_to_pattern(text):
     return coordinates
 
 
+class PatternPixel:
+    """
+    One lit pixel, a slotted stand-in for the dicts from text_to_pattern
+    Supports coord['week'] and coord.get('level', ...) style access so it works wherever those dicts do
+    level is the shade (1-MAX_LEVEL), see intensity.py
+    """
+    __slots__ = ('week', 'day', 'char', 'char_index', 'level')
+
+    def __init__(self, week, day, char, char_index, level=MAX_LEVEL):
+        self.week = week
+        self.day = day
+        self.char = char
+        self.char_index = char_index
+        self.level = level
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return f"PatternPixel(week={self.week}, day={self.day}, char={self.char!r}, char_index={self.char_index}, level={self.level})"
+
+
+def iter_pattern(text):
+    """
+    Lazily yield the pixels of text as PatternPixel records
+    Same pixels, in the same order, as text_to_pattern
+    """
+    if not text:
+        return
+    
+    current_week = 0
+    for char_index, char in enumerate(text.upper()):
+        for col, mask in enumerate(GLYPH_COLUMNS.get(char, UNKNOWN_GLYPH_COLUMNS)):
+            for day in iter_column_days(mask):
+                yield PatternPixel(current_week + col, day, char, char_index)
+        current_week += CHAR_WIDTH + CHAR_SPACING
+
+
+class CompactPattern:
+    """
+    Pixels stored as parallel array('H') columns (levels as array('B')), each character kept once at its char_index
+    A few bytes per pixel instead of a dict each; records are built on access
+    """
+
+    def __init__(self):
+        self.weeks = array('H')
+        self.days = array('H')
+        self.char_indexes = array('H')
+        self.levels = array('B')
+        self.chars = []
+
+    @classmethod
+    def from_text(cls, text):
+        """Compact pattern for text"""
+        pattern = cls.from_coordinates(iter_pattern(text))
+        pattern.chars = list(text.upper())
+        return pattern
+
+    @classmethod
+    def from_coordinates(cls, coordinates):
+        """Compact any iterable of coordinate dicts or PatternPixel records (dicts without 'level' are MAX_LEVEL)"""
+        pattern = cls()
+        chars = pattern.chars
+        for coord in coordinates:
+            char_index = coord['char_index']
+            if char_index >= len(chars):
+                chars.extend([None] * (char_index + 1 - len(chars)))
+            chars[char_index] = coord['char']
+            pattern.weeks.append(coord['week'])
+            pattern.days.append(coord['day'])
+            pattern.char_indexes.append(char_index)
+            pattern.levels.append(coord.get('level', MAX_LEVEL))
+        return pattern
+
+    def __len__(self):
+        return len(self.weeks)
+
+    def __getitem__(self, position):
+        char_index = self.char_indexes[position]
+        return PatternPixel(self.weeks[position], self.days[position], self.chars[char_index], char_index, self.levels[position])
+
+    def __iter__(self):
+        chars = self.chars
+        for week, day, char_index, level in zip(self.weeks, self.days, self.char_indexes, self.levels):
+            yield PatternPixel(week, day, chars[char_index], char_index, level)
+
+
 def preview_pattern(text):
     """
     Generate a 2D preview array for visualization
@@ -79,32 +278,23 @@ def preview_pattern(text):
     if not text:
         return []
     
-    coordinates = text_to_pattern(text)
-    required_weeks = calculate_required_weeks(text)
-    
-    # Create empty grid
-    grid = [[0 for _ in range(required_weeks)] for _ in range(MAX_DAYS)]
-    
-    # Fill in the pattern
-    for coord in coordinates:
-        week, day = coord['week'], coord['day']
-        if week < required_weeks and day < MAX_DAYS:
-            grid[day][week] = 1
+    columns = text_to_columns(text)
     
-    return grid
+    # Unpack each day's bit across all columns
+    return [[(mask >> day) & 1 for mask in columns] for day in range(MAX_DAYS)]
 
 
-def get_pattern_stats(text):
-    """Get pattern statistics"""
-    coordinates = text_to_pattern(text)
+def get_pattern_stats(text, max_weeks=MAX_WEEKS):
+    """Get pattern statistics for a graph of max_weeks columns"""
+    commits = sum(mask.bit_count() for mask in text_to_columns(text))
     required_weeks = calculate_required_weeks(text)
-    max_chars = get_max_characters()
+    max_chars = get_max_characters(max_weeks)
     
     return {
         'characters': len(text),
         'max_characters': max_chars,
-        'commits': len(coordinates),
+        'commits': commits,
         'weeks': required_weeks,
-        'max_weeks': MAX_WEEKS,
-        'fits_in_graph': required_weeks <= MAX_WEEKS
+        'max_weeks': max_weeks,
+        'fits_in_graph': required_weeks <= max_weeks
     }
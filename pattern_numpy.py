@@ -0,0 +1,57 @@
+"""
+NumPy grid engine for the pattern calculator
+The contribution grid is a uint8 array (7 days x weeks) unpacked from the render cache
+Falls back to the pure-Python pattern_calculator when NumPy isn't installed
+"""
+
+import pattern_calculator
+from pattern_calculator import (
+    MAX_DAYS, MAX_WEEKS,
+    calculate_required_weeks, get_max_characters, text_to_columns
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+if HAS_NUMPY:
+    # Row index of each day, for unpacking column bitmasks
+    DAY_SHIFTS = np.arange(MAX_DAYS, dtype=np.uint8)[:, None]
+
+
+def cached_grid(text):
+    """
+    Grid for text as a uint8 array of shape (7, weeks), 1 = lit, unpacked from the render
+    cache's column masks, so repeated and prefix-extended texts aren't re-rendered
+    """
+    columns = np.array(text_to_columns(text), dtype=np.uint8)
+    return (columns[None, :] >> DAY_SHIFTS) & 1
+
+
+def preview_pattern(text):
+    """Same as pattern_calculator.preview_pattern, computed on arrays"""
+    if not HAS_NUMPY:
+        return pattern_calculator.preview_pattern(text)
+    if not text:
+        return []
+    return cached_grid(text).tolist()
+
+
+def get_pattern_stats(text, max_weeks=MAX_WEEKS):
+    """Same as pattern_calculator.get_pattern_stats, with the commit count as an array reduction"""
+    if not HAS_NUMPY:
+        return pattern_calculator.get_pattern_stats(text, max_weeks)
+
+    required_weeks = calculate_required_weeks(text)
+    return {
+        'characters': len(text),
+        'max_characters': get_max_characters(max_weeks),
+        'commits': int(cached_grid(text).sum()),
+        'weeks': required_weeks,
+        'max_weeks': max_weeks,
+        'fits_in_graph': required_weeks <= max_weeks
+    }
+
@@ -0,0 +1,233 @@
+"""
+Dry-run planner: what a run would do, without writing anything
+Plans the exact commits per day like create_pattern_commits does, then estimates the objects,
+pack size and wall time from a cost model fitted to the benchmark results (see benchmark.py)
+"""
+
+import os
+import json
+from git import Repo
+from canvas import ContributionCanvas
+from intensity import effective_peak
+from pattern_calculator import MAX_LEVEL
+from commit_index import load_commit_index
+from git_bot import build_plan, COMMIT_BACKENDS, PAYLOAD_MODES
+
+CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+
+def _fit(points):
+    """Least-squares line through (x, y) points, returned as (intercept, slope), both at least 0"""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread if spread else 0.0
+    slope = max(0.0, slope)
+    return max(0.0, mean_y - slope * mean_x), slope
+
+
+def _per_pixel_and_commit(results, key):
+    """
+    Split a measured cost into a per-pixel and a per-commit part
+    The benchmark draws one pattern at several intensities, so the slope over the commit count
+    is the per-commit cost and everything else is charged to the pattern's pixels
+    """
+    pixels = min(result.get('pixels') or result['commits'] for result in results)
+    intercept, slope = _fit([(result['commits'], result[key]) for result in results])
+    return {'per_pixel': intercept / pixels, 'per_commit': slope}
+
+
+_calibrations = {}
+
+
+def load_calibration(path=CALIBRATION_FILE):
+    """
+    Cost model from a benchmark results file, re-read only when the file changes
+    Returns {'seconds': {backend: {'per_pixel', 'per_commit'}}, 'pack_seconds': {backend: ...},
+    'pack_kib': {'per_pixel', 'per_commit'} or None, 'cpus'}, or None without a results file
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if path in _calibrations and _calibrations[path][0] == mtime:
+        return _calibrations[path][1]
+
+    with open(path) as f:
+        results = json.load(f)
+
+    by_backend = {}
+    for name, result in results.get('commit', {}).items():
+        by_backend.setdefault(name.split('/')[0], []).append(result)
+
+    calibration = {'seconds': {}, 'pack_seconds': {}, 'pack_kib': None, 'cpus': results.get('environment', {}).get('cpus')}
+    for backend, backend_results in by_backend.items():
+        calibration['seconds'][backend] = _per_pixel_and_commit(backend_results, 'seconds')
+        if all('pack_seconds' in result for result in backend_results):
+            calibration['pack_seconds'][backend] = _per_pixel_and_commit(backend_results, 'pack_seconds')
+        if calibration['pack_kib'] is None and all('pack_kib' in result for result in backend_results):
+            # The pack is the same whichever backend wrote the objects
+            calibration['pack_kib'] = _per_pixel_and_commit(backend_results, 'pack_kib')
+
+    _calibrations[path] = (mtime, calibration)
+    return calibration
+
+
+_existing_counts = {}
+
+
+def existing_commit_counts(target_dir):
+    """
+    Per-day commit counts of the local repository at target_dir, or None if there isn't one
+    The saved commit index is read but never updated, so the counts are kept per (target_dir, HEAD):
+    a missing or stale index is scanned once, not on every replan. Treat the result as read-only
+    """
+    if not os.path.isdir(os.path.join(target_dir, '.git')):
+        return None
+
+    repo = Repo(target_dir)
+    head = repo.head.commit.hexsha if repo.head.is_valid() else None
+    cached = _existing_counts.get(target_dir)
+    if cached is not None and cached[0] == head:
+        return cached[1]
+
+    counts = load_commit_index(repo, save=False)
+    _existing_counts[target_dir] = (head, counts)
+    return counts
+
+
+def plan_run(coordinates, intensity=1, canvas=None, backend='gitpython', payload='pixel', existing_counts=None, pack=True, calibration=None):
+    """
+    Plan a create_pattern_commits run without touching any repository
+    existing_counts (a CommitCountIndex or {date: count}) plans an incremental run on top of that history
+    calibration defaults to load_calibration(); without one the estimates are None
+    Returns the exact schedule (one {'date', 'week', 'day', 'level', 'commits'} per pixel that needs
+    commits), totals, the date range, the objects the run adds, and estimates of the pack size in KiB
+    and of the wall time for the chosen backend ('seconds') and for every calibrated backend
+    ('backend_seconds'); pushing is not included (benchmark.py times it apart from the commits)
+    """
+    if backend not in COMMIT_BACKENDS:
+        raise Exception(f"Unknown commit backend '{backend}' (choose from {', '.join(COMMIT_BACKENDS)})")
+    if payload not in PAYLOAD_MODES:
+        raise Exception(f"Unknown payload mode '{payload}' (choose from {', '.join(PAYLOAD_MODES)})")
+
+    canvas = canvas or ContributionCanvas.last_year()
+    calibration = calibration or load_calibration()
+
+    peak = effective_peak(intensity, existing_counts, canvas.days)
+    positions, cells, plan_commits = build_plan(coordinates, peak, canvas, existing_counts)
+
+    schedule = []
+    for position, cell, commits in zip(positions, cells, plan_commits):
+        coord = coordinates[position]
+        schedule.append({
+            'date': canvas.days[cell],
+            'week': coord['week'],
+            'day': coord['day'],
+            'level': coord.get('level', MAX_LEVEL),
+            'commits': commits
+        })
+    schedule.sort(key=lambda entry: entry['date'])
+
+    pixels = len(schedule)
+    commits = sum(plan_commits)
+    # One blob and one tree per pixel's data.json, or a single pair shared by the whole run
+    contents = min(pixels, 1) if payload == 'constant' else pixels
+
+    plan = {
+        'backend': backend,
+        'payload': payload,
+        'pixels': pixels,
+        'commits': commits,
+        'skipped_pixels': len(coordinates) - pixels,
+        'peak': peak,
+        'first_date': schedule[0]['date'] if schedule else None,
+        'last_date': schedule[-1]['date'] if schedule else None,
+        'objects': {'commits': commits, 'trees': contents, 'blobs': contents, 'total': commits + 2 * contents},
+        'pack_kib': None,
+        'seconds': None,
+        'backend_seconds': {},
+        'schedule': schedule
+    }
+    if not calibration or not pixels:
+        return plan
+
+    def cost(model, pixel_count):
+        return model['per_pixel'] * pixel_count + model['per_commit'] * commits
+
+    if calibration['pack_kib']:
+        plan['pack_kib'] = round(cost(calibration['pack_kib'], contents))
+
+    for name, model in calibration['seconds'].items():
+        seconds = {'commits': cost(model, pixels), 'pack': 0.0}
+        if pack and name in calibration['pack_seconds']:
+            seconds['pack'] = cost(calibration['pack_seconds'][name], contents)
+        seconds['total'] = seconds['commits'] + seconds['pack']
+        plan['backend_seconds'][name] = round(seconds['total'], 3)
+        if name == backend:
+            plan['seconds'] = {key: round(value, 3) for key, value in seconds.items()}
+    return plan
+
+
+def format_duration(seconds):
+    """Rough human duration: '0.4s', '12s', '3m 20s', '1h 05m'"""
+    if seconds < 10:
+        return f"{seconds:.1f}s"
+    seconds = round(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+def describe_plan(plan):
+    """Human-readable lines for a plan_run result"""
+    if not plan['pixels']:
+        return [f"Nothing to commit ({plan['skipped_pixels']} pixels already drawn)"]
+
+    objects = plan['objects']
+    lines = [
+        f"{plan['commits']} commits on {plan['pixels']} days, {plan['first_date']} to {plan['last_date']} (peak {plan['peak']}/day)",
+        f"{objects['total']} new objects: {objects['commits']} commits, {objects['trees']} trees, {objects['blobs']} blobs",
+    ]
+    if plan['skipped_pixels']:
+        lines.append(f"{plan['skipped_pixels']} pixels already drawn")
+    if plan['pack_kib'] is not None:
+        lines.append(f"Estimated pack size: ~{plan['pack_kib']} KiB")
+    if plan['seconds']:
+        seconds = plan['seconds']
+        lines.append(
+            f"Estimated time with {plan['backend']}: ~{format_duration(seconds['total'])}"
+            f" (commits {format_duration(seconds['commits'])}, pack {format_duration(seconds['pack'])})"
+        )
+        others = [f"{name} ~{format_duration(total)}" for name, total in plan['backend_seconds'].items() if name != plan['backend']]
+        if others:
+            lines.append(f"Other backends: {', '.join(others)}")
+    else:
+        lines.append("No benchmark calibration found, run benchmark.py --update-baseline for time estimates")
+    return lines
+
+
+def summarize_plan(plan):
+    """describe_plan in one line, e.g. for a status label"""
+    if not plan['pixels']:
+        return f"Plan: nothing to commit, all {plan['skipped_pixels']} pixels already drawn"
+
+    parts = [f"Plan: {plan['commits']} commits, {plan['first_date']} to {plan['last_date']}", f"{plan['objects']['total']} objects"]
+    if plan['pack_kib'] is not None:
+        parts.append(f"~{plan['pack_kib']} KiB pack")
+    if plan['seconds']:
+        parts.append(f"~{format_duration(plan['seconds']['total'])} with {plan['backend']}")
+    return ' | '.join(parts)
+
+
+def plan_to_dict(plan):
+    """JSON-serializable copy of a plan (dates as ISO strings)"""
+    def iso(day):
+        return day.isoformat() if day else None
+
+    result = dict(plan, first_date=iso(plan['first_date']), last_date=iso(plan['last_date']))
+    result['schedule'] = [dict(entry, date=iso(entry['date'])) for entry in plan['schedule']]
+    return result
@@ -0,0 +1,113 @@
+"""
+Push stage for generated histories
+Pushes run with retry/backoff, either synchronously or in batches on a background thread
+"""
+
+import time
+import threading
+from git import Repo
+
+PUSH_BATCH_COMMITS = 1000  # Commits generated between background pushes
+PUSH_RETRIES = 3
+PUSH_BACKOFF = 1.0  # Seconds before the first retry, doubled on each attempt
+
+
+def init_bare_remote(path):
+    """Create (or reuse) a local bare repository to stand in for the remote, e.g. for offline runs"""
+    return Repo.init(path, bare=True)
+
+
+def push_with_retry(remote, refspec, force=True, retries=PUSH_RETRIES, backoff=PUSH_BACKOFF):
+    """Push refspec to remote, retrying failed attempts with exponential backoff"""
+    delay = backoff
+    for attempt in range(retries + 1):
+        try:
+            remote.push(refspec=refspec, force=force).raise_if_error()
+            return
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(delay)
+            delay *= 2
+
+
+class PushStage:
+    """
+    Background pusher fed by the commit loop
+    notify() reports new commits; once batch_commits have accumulated the current tip is pushed
+    while generation carries on. Only the latest tip is pushed, so a slow remote never queues up work.
+    """
+
+    def __init__(self, repo, branch, batch_commits=PUSH_BATCH_COMMITS, retries=PUSH_RETRIES, backoff=PUSH_BACKOFF, force=True, remote='origin'):
+        # The pusher gets its own Repo so it never shares GitPython state with the commit loop
+        self.repo = Repo(repo.git_dir)
+        self.branch = branch
+        self.batch_commits = batch_commits
+        self.retries = retries
+        self.backoff = backoff
+        self.force = force
+        self.remote = remote
+
+        self.condition = threading.Condition()
+        self.latest = None
+        self.pending = None
+        self.unpushed = 0
+        self.closed = False
+        self.error = None
+        self.pushes = 0
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def notify(self, head, commits):
+        """Report that the branch now points at head, with commits new since the last notify"""
+        with self.condition:
+            self.latest = head
+            self.unpushed += commits
+            if self.unpushed >= self.batch_commits:
+                self.pending = head
+                self.unpushed = 0
+                self.condition.notify()
+
+    def close(self, flush=True):
+        """
+        Stop the stage, pushing the latest tip first when flush is set
+        Raises if any push failed after all retries
+        """
+        with self.condition:
+            if flush and self.unpushed:
+                self.pending = self.latest
+                self.unpushed = 0
+            elif not flush:
+                self.pending = None
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+        if self.error:
+            raise Exception(f"Failed to push to remote: {str(self.error)}")
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                head, self.pending = self.pending, None
+                if head is None:
+                    return
+
+            if self.error:
+                # Don't keep hammering a remote that already failed
+                continue
+
+            try:
+                push_with_retry(
+                    self.repo.remote(self.remote),
+                    f'{head}:refs/heads/{self.branch}',
+                    self.force,
+                    self.retries,
+                    self.backoff
+                )
+                self.pushes += 1
+            except Exception as e:
+                self.error = e
@@ -0,0 +1,64 @@
+"""
+Run journal for resumable pattern generation
+Records how far a run got so a restart can continue instead of starting over
+"""
+
+import os
+import json
+import hashlib
+from pattern_calculator import MAX_LEVEL
+
+JOURNAL_FILENAME = 'contribution-run.json'
+
+
+def journal_path(repo):
+    """Location of the journal file for a repository"""
+    return os.path.join(repo.git_dir, JOURNAL_FILENAME)
+
+
+def pattern_fingerprint(coordinates, intensity, origin=None):
+    """Identify a run by its pixels, intensity and canvas origin date, hashed as a stream"""
+    digest = hashlib.sha1(f"{intensity};".encode('utf-8'))
+    if origin:
+        digest.update(f"{origin.isoformat()};".encode('utf-8'))
+    for coord in coordinates:
+        level = coord.get('level', MAX_LEVEL)
+        # Plain text pixels (full level) hash without a level suffix
+        suffix = f",{level}" if level != MAX_LEVEL else ''
+        digest.update(f"{coord['week']},{coord['day']},{coord['char']}{suffix};".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_journal(repo):
+    """Return the journal of an unfinished run, or None"""
+    try:
+        with open(journal_path(repo)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_journal(repo, fingerprint, completed, total, head):
+    """
+    Record progress: the first `completed` coordinates are fully committed and HEAD is `head`
+    """
+    journal = {
+        'fingerprint': fingerprint,
+        'completed': completed,
+        'total': total,
+        'head': head
+    }
+
+    path = journal_path(repo)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(journal, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def clear_journal(repo):
+    """Forget the journal once a run has finished"""
+    try:
+        os.remove(journal_path(repo))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,93 @@
+"""
+Run instrumentation: per-stage wall time, commit throughput and bytes written
+Pass a RunReport to initialize_repo / create_pattern_commits to collect one;
+the default NULL_REPORT records nothing and costs next to nothing
+"""
+
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+REPORT_FILENAME = 'contribution-report.json'  # Where the GUI keeps the last run's report, inside .git
+
+
+class RunReport:
+    """Collects timings and counters for one generation run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.stages = {}
+        self.counters = {'commits': 0, 'pixels': 0, 'bytes_written': 0}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block under a stage name (repeated blocks accumulate)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        stage['seconds'] += seconds
+        stage['calls'] += 1
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        """Stop the wall clock"""
+        self.finished = time.perf_counter()
+
+    def to_dict(self):
+        """Machine-readable report"""
+        wall = (self.finished or time.perf_counter()) - self.started
+        commits = self.counters['commits']
+        return {
+            'wall_seconds': round(wall, 6),
+            'commits_per_second': round(commits / wall, 2) if wall > 0 else None,
+            'counters': dict(self.counters),
+            'stages': {
+                name: {'seconds': round(stage['seconds'], 6), 'calls': stage['calls']}
+                for name, stage in sorted(self.stages.items(), key=lambda item: -item[1]['seconds'])
+            }
+        }
+
+    def write(self, path):
+        """Write the report as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary_lines(self):
+        """Short human-readable summary, slowest stages first"""
+        report = self.to_dict()
+        lines = [
+            f"⏱ {report['wall_seconds']:.2f}s total, {report['counters']['commits']} commits "
+            f"({report['commits_per_second'] or 0} commits/s), {report['counters']['bytes_written']} bytes written"
+        ]
+        for name, stage in report['stages'].items():
+            lines.append(f"   - {name}: {stage['seconds']:.3f}s ({stage['calls']} calls)")
+        return lines
+
+
+class NullReport:
+    """Stand-in used when instrumentation is off"""
+
+    _context = nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_REPORT = NullReport()